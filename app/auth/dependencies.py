@@ -4,15 +4,27 @@ from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from sqlalchemy.orm import Session
 
-from app import models, database
-from app.auth.utils import is_blacklisted
+from app import metrics, models, database, schemas
+from app.auth.utils import is_blacklisted, revocation_filter
+from app.cache import LRUCache
 
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "1024"))
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "300"))
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
+# token -> snapshot user yang sudah terautentikasi, tidak pernah melewati exp token
+principal_cache = LRUCache(maxsize=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_CACHE_TTL)
+metrics.register_cache("principal", principal_cache)
+
+
+def invalidate_principal(user_id: int):
+    principal_cache.delete_where(lambda principal: principal.id == user_id)
+
+
+def _authenticate(db: Session, token: str):
     if is_blacklisted(db, token):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -40,4 +52,22 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     user = db.query(models.User).filter(models.User.email == email).first()
     if user is None:
         raise credentials_exception
-    return user
\ No newline at end of file
+
+    # Snapshot terpisah dari session, aman dipakai ulang lintas request.
+    # UserRecord (email: str) karena email admin dari create_admin.py tidak divalidasi
+    principal = schemas.UserRecord.model_validate(user)
+    principal_cache.set(token, principal, expires_at=payload.get("exp"))
+    return principal
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme),
+                           db: database.DBSession = Depends(database.get_session)):
+    principal = principal_cache.get(token)
+    # Hit cache tetap dicek ke filter revocation (tanpa query kecuali jadwal refresh),
+    # supaya logout di worker lain berlaku tanpa menunggu TTL cache
+    if principal is not None and revocation_filter.enabled:
+        if revocation_filter.refresh_due():
+            await database.run_db(db, revocation_filter.refresh)
+        if not revocation_filter.might_contain(token):
+            return principal
+    return await database.run_db(db, _authenticate, token)
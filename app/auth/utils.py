@@ -1,16 +1,27 @@
+import asyncio
+import hashlib
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-from fastapi import HTTPException
+from fastapi import HTTPException, status
 from passlib.context import CryptContext
 from datetime import datetime, timedelta, timezone
-from jose import jwt
+from jose import JWTError, jwt
+from sqlalchemy import DateTime, Integer, String, delete, inspect, insert, select, text
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session
 
-from app import models
+from app import metrics, models
 
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
 ACCESS_TOKEN_EXPIRE_hours = 30
+REVOCATION_REFRESH_SECONDS = float(os.getenv("REVOCATION_REFRESH_SECONDS", "5"))
+BLACKLIST_PURGE_BATCH = int(os.getenv("BLACKLIST_PURGE_BATCH", "1000"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", "32"))
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -20,21 +31,154 @@ def hash_password(plain: str):
 def verify_password(plain, hashed):
     return pwd_context.verify(plain, hashed)
 
+
+# bcrypt melepas GIL, jadi cukup thread pool terpisah dari threadpool Starlette.
+# Slot = worker + antrean; kalau penuh langsung 503 daripada menumpuk request.
+_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_hash_slots = threading.BoundedSemaphore(PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE)
+
+
+async def _run_hashing(fn, *args):
+    if not _hash_slots.acquire(blocking=False):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, please try again later",
+            headers={"Retry-After": "1"}
+        )
+    try:
+        future = _hash_executor.submit(fn, *args)
+    except BaseException:
+        _hash_slots.release()
+        raise
+    future.add_done_callback(lambda _: _hash_slots.release())
+    return await asyncio.wrap_future(future)
+
+
+async def hash_password_async(plain: str):
+    return await _run_hashing(metrics.timed_hash, "hash", hash_password, plain)
+
+
+async def verify_password_async(plain, hashed):
+    return await _run_hashing(metrics.timed_hash, "verify", verify_password, plain, hashed)
+
 def create_access_token(data: dict, expires_delta: timedelta = timedelta(hours=ACCESS_TOKEN_EXPIRE_hours)):
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + expires_delta
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
+def token_digest(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
+
+
+def token_expiry(token: str) -> datetime:
+    try:
+        exp = jwt.get_unverified_claims(token).get("exp")
+    except JWTError:
+        exp = None
+    if exp is None:
+        return datetime.now(timezone.utc) + timedelta(hours=ACCESS_TOKEN_EXPIRE_hours)
+    return datetime.fromtimestamp(exp, tz=timezone.utc)
+
+
+def _utc(value: datetime) -> datetime:
+    # SQLite mengembalikan DateTime tanpa tzinfo, nilainya selalu UTC
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+# Set digest token yang dicabut, di depan tabel blacklisted_tokens.
+# Tidak ada di set -> pasti belum dicabut (kecuali dicabut worker lain setelah refresh terakhir);
+# ada di set -> cek ulang ke tabel.
+class RevocationFilter:
+    def __init__(self, refresh_seconds: float = REVOCATION_REFRESH_SECONDS):
+        self.enabled = False
+        self.refresh_seconds = refresh_seconds
+        self._digests: dict = {}
+        self._by_user: dict = {}
+        self._last_id = 0
+        self._refreshed_at = 0.0
+        self._lock = threading.Lock()
+
+    def _add(self, digest: bytes, user_id: int, expires_at: datetime):
+        self._digests[digest] = _utc(expires_at)
+        self._by_user.setdefault(user_id, set()).add(digest)
+
+    def _query(self, db: Session):
+        return db.query(
+            models.BlacklistedToken.id,
+            models.BlacklistedToken.user_id,
+            models.BlacklistedToken.token_hash,
+            models.BlacklistedToken.expires_at
+        )
+
+    def load(self, db: Session):
+        rows = self._query(db).all()
+        with self._lock:
+            self._digests.clear()
+            self._by_user.clear()
+            for row in rows:
+                self._add(row.token_hash, row.user_id, row.expires_at)
+            self._last_id = max((row.id for row in rows), default=0)
+            self._refreshed_at = time.monotonic()
+            self.enabled = True
+
+    def refresh_due(self) -> bool:
+        return time.monotonic() - self._refreshed_at >= self.refresh_seconds
+
+    # Ambil baris baru yang ditambahkan proses lain sejak refresh terakhir
+    def refresh(self, db: Session):
+        if not self.refresh_due():
+            return
+        rows = self._query(db).filter(models.BlacklistedToken.id > self._last_id).all()
+        with self._lock:
+            for row in rows:
+                self._add(row.token_hash, row.user_id, row.expires_at)
+                self._last_id = max(self._last_id, row.id)
+            self._refreshed_at = time.monotonic()
+
+    def add(self, token: str, user_id: int, expires_at: datetime):
+        with self._lock:
+            self._add(token_digest(token), user_id, expires_at)
+
+    def discard_user(self, user_id: int):
+        with self._lock:
+            for digest in self._by_user.pop(user_id, ()):
+                self._digests.pop(digest, None)
+
+    def prune(self, now: datetime):
+        with self._lock:
+            expired = [digest for digest, expires_at in self._digests.items() if expires_at <= now]
+            for digest in expired:
+                del self._digests[digest]
+            for user_id in list(self._by_user):
+                self._by_user[user_id].difference_update(expired)
+                if not self._by_user[user_id]:
+                    del self._by_user[user_id]
+
+    def might_contain(self, token: str) -> bool:
+        return token_digest(token) in self._digests
+
+    def __len__(self):
+        return len(self._digests)
+
+
+revocation_filter = RevocationFilter()
+
+
 def add_to_blacklist(db: Session, token: str, user_id: int):
-    if not db.query(models.BlacklistedToken).filter_by(token=token).first():
+    digest = token_digest(token)
+    if not db.query(models.BlacklistedToken.id).filter_by(token_hash=digest).first():
+        expires_at = token_expiry(token)
         blacklisted = models.BlacklistedToken(
-            token=token,
+            token_hash=digest,
             user_id=user_id,
+            expires_at=expires_at,
             blacklisted_at=datetime.now(timezone.utc)
         )
         db.add(blacklisted)
         db.commit()
+        revocation_filter.add(token, user_id, expires_at)
+        purge_expired_tokens(db, batch_size=BLACKLIST_PURGE_BATCH)
     else:
         raise HTTPException(
             status_code=400,
@@ -42,8 +186,110 @@ def add_to_blacklist(db: Session, token: str, user_id: int):
         )
 
 def is_blacklisted(db: Session, token: str) -> bool:
-    return db.query(models.BlacklistedToken).filter_by(token=token).first() is not None
+    if revocation_filter.enabled:
+        revocation_filter.refresh(db)
+        if not revocation_filter.might_contain(token):
+            return False
+    digest = token_digest(token)
+    return db.query(models.BlacklistedToken.id).filter_by(token_hash=digest).first() is not None
 
 def remove_old_token(db: Session, user_id: int):
     db.query(models.BlacklistedToken).filter(models.BlacklistedToken.user_id == user_id).delete()
     db.commit()
+    revocation_filter.discard_user(user_id)
+
+
+# Hapus token yang sudah lewat exp; token seperti itu ditolak jwt.decode, jadi tidak perlu disimpan.
+# exhaust=True -> ulangi per batch sampai habis
+def purge_expired_tokens(db: Session, batch_size: int = BLACKLIST_PURGE_BATCH, exhaust: bool = False) -> int:
+    now = datetime.now(timezone.utc)
+    table = models.BlacklistedToken
+    purged = 0
+    while True:
+        expired_ids = select(table.id).where(table.expires_at <= now).limit(batch_size).scalar_subquery()
+        deleted = db.execute(delete(table).where(table.id.in_(expired_ids))).rowcount
+        db.commit()
+        purged += deleted
+        if not exhaust or deleted < batch_size:
+            break
+    revocation_filter.prune(now)
+    return purged
+
+
+# Migrasi satu kali dari format lama (kolom token berisi JWT utuh) ke token_hash + expires_at.
+# DDL di SQLite tidak ikut transaksi, jadi migrasi yang terputus dilanjutkan dari tabel _legacy.
+def migrate_blacklist_storage(engine: Engine, batch_size: int = 1000):
+    table = models.BlacklistedToken.__table__
+    legacy = f"{table.name}_legacy"
+    inspector = inspect(engine)
+    legacy_format = (
+        inspector.has_table(table.name)
+        and "token" in {column["name"] for column in inspector.get_columns(table.name)}
+    )
+    if not legacy_format and not inspector.has_table(legacy):
+        return 0
+    indexes = [index["name"] for index in inspector.get_indexes(table.name)] if legacy_format else []
+
+    now = datetime.now(timezone.utc)
+    migrated = 0
+    with engine.begin() as conn:
+        if legacy_format:
+            conn.execute(text(f"ALTER TABLE {table.name} RENAME TO {legacy}"))
+            for index in indexes:
+                conn.execute(text(f"DROP INDEX IF EXISTS {index}"))
+        table.create(conn, checkfirst=True)
+        conn.execute(delete(table))
+
+        legacy_rows = text(f"SELECT user_id, token, blacklisted_at FROM {legacy}").columns(
+            user_id=Integer, token=String, blacklisted_at=DateTime
+        )
+        result = conn.execution_options(yield_per=batch_size).execute(legacy_rows)
+        for rows in result.partitions():
+            batch = []
+            for user_id, token, blacklisted_at in rows:
+                expires_at = token_expiry(token)
+                if expires_at <= now:
+                    continue
+                batch.append({
+                    "user_id": user_id,
+                    "token_hash": token_digest(token),
+                    "expires_at": expires_at,
+                    "blacklisted_at": blacklisted_at,
+                })
+            if batch:
+                conn.execute(insert(table), batch)
+                migrated += len(batch)
+        conn.execute(text(f"DROP TABLE {legacy}"))
+    return migrated
+
+
+# Tabel blacklisted_tokens lama dibuat tanpa AUTOINCREMENT, jadi SQLite bisa memakai ulang id
+# yang sudah dihapus. Tabel dibangun ulang dengan id yang sama; lanjut dari tabel _rebuild kalau terputus.
+def migrate_blacklist_autoincrement(engine: Engine) -> bool:
+    if engine.dialect.name != "sqlite":
+        return False
+    table = models.BlacklistedToken.__table__
+    rebuild = f"{table.name}_rebuild"
+    inspector = inspect(engine)
+    if not inspector.has_table(rebuild):
+        if not inspector.has_table(table.name):
+            return False
+        with engine.connect() as conn:
+            ddl = conn.execute(
+                text("SELECT sql FROM sqlite_master WHERE type='table' AND name=:name"), {"name": table.name}
+            ).scalar()
+        if "AUTOINCREMENT" in ddl.upper():
+            return False
+
+    columns = ", ".join(column.name for column in table.columns)
+    with engine.begin() as conn:
+        if not inspector.has_table(rebuild):
+            conn.execute(text(f"ALTER TABLE {table.name} RENAME TO {rebuild}"))
+        # Index ikut pindah ke tabel yang di-rename; namanya dibutuhkan lagi oleh tabel baru
+        for index in inspect(conn).get_indexes(rebuild):
+            conn.execute(text(f"DROP INDEX IF EXISTS {index['name']}"))
+        table.create(conn, checkfirst=True)
+        conn.execute(delete(table))
+        conn.execute(text(f"INSERT INTO {table.name} ({columns}) SELECT {columns} FROM {rebuild}"))
+        conn.execute(text(f"DROP TABLE {rebuild}"))
+    return True
@@ -0,0 +1,54 @@
+import hashlib
+from datetime import timezone
+from email.utils import format_datetime
+from typing import Optional
+
+from fastapi import Response
+
+
+# Versi satu baris: (id, version) saja tidak cukup karena SQLite memakai ulang id baris yang dihapus
+# dan baris baru selalu mulai dari version 1, jadi updated_at (diisi saat insert) ikut membedakan baris baru
+def row_version(row) -> str:
+    stamp = row.updated_at
+    if stamp is not None and stamp.tzinfo is not None:
+        stamp = stamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return f"{row.id}.{row.version}.{stamp.isoformat() if stamp is not None else ''}"
+
+
+# Weak ETag dari versi setiap baris, plus penanda bentuk response
+def etag_for(rows, *extra) -> str:
+    parts = [row_version(row) for row in rows] + [str(part) for part in extra]
+    digest = hashlib.sha1(",".join(parts).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    if "*" in tags:
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.removeprefix("W/") == opaque for tag in tags)
+
+
+def last_modified(rows) -> Optional[str]:
+    stamps = [row.updated_at for row in rows if row.updated_at is not None]
+    if not stamps:
+        return None
+    latest = max(stamps)
+    if latest.tzinfo is None:
+        latest = latest.replace(tzinfo=timezone.utc)
+    latest = latest.astimezone(timezone.utc)
+    return format_datetime(latest.replace(microsecond=0), usegmt=True)
+
+
+def validator_headers(etag: str, modified: Optional[str]) -> dict:
+    headers = {"ETag": etag}
+    if modified:
+        headers["Last-Modified"] = modified
+    return headers
+
+
+def not_modified(etag: str, modified: Optional[str]) -> Response:
+    return Response(status_code=304, headers=validator_headers(etag, modified))
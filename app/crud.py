@@ -1,16 +1,71 @@
-from typing import Optional, Union
+import csv
+import io
+import json
+import os
+import threading
+from collections import Counter
+from datetime import date, timedelta
+from typing import BinaryIO, Iterator, Optional, Union
 
 from fastapi import HTTPException, status
-from sqlalchemy import or_
+from pydantic import ValidationError
+from sqlalchemy import bindparam, case, delete, func, insert, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from app import models, schemas
+from app import conditional, metrics, models, schemas, search, suggest
+from app.auth.dependencies import invalidate_principal
 from app.auth.utils import hash_password, verify_password
+from app.cache import LRUCache
+
+BOOK_IMPORT_CHUNK = 1000
+BOOK_IMPORT_MAX_ERRORS = 1000
+EXPORT_BATCH_SIZE = 1000
+# Batas jumlah parameter per IN (...) untuk multi-get
+MULTI_GET_CHUNK = 100
+
+# Cache buku per id dan halaman hasil pencarian keyword (snapshot BookResponse)
+book_cache = LRUCache(
+    maxsize=int(os.getenv("BOOK_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("BOOK_CACHE_TTL", "30"))
+)
+book_search_cache = LRUCache(
+    maxsize=int(os.getenv("BOOK_SEARCH_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("BOOK_SEARCH_CACHE_TTL", "30"))
+)
+metrics.register_cache("book", book_cache)
+metrics.register_cache("book_search", book_search_cache)
+_book_cache_generation = 0
+_book_cache_lock = threading.Lock()
+
+
+# membership_changed=True: buku baru/judul berubah, hasil pencarian mana pun bisa berubah
+def invalidate_books(book_ids=(), membership_changed: bool = False):
+    global _book_cache_generation
+    with _book_cache_lock:
+        _book_cache_generation += 1
+    ids = set(book_ids)
+    for book_id in ids:
+        book_cache.delete(book_id)
+    if membership_changed:
+        book_search_cache.clear()
+    elif ids:
+        book_search_cache.delete_where(lambda page: any(book.id in ids for book in page))
+
+
+# ?fields=: hanya kolom terpilih + version/updated_at (untuk ETag), tanpa hidrasi entity ORM
+def _projected(db: Session, model, fields: Optional[tuple]):
+    if not fields:
+        return db.query(model)
+    names = dict.fromkeys([*fields, "version", "updated_at"])
+    return db.query(*(getattr(model, name) for name in names))
 
 
 # User
-def create_user(db: Session, user: schemas.UserCreate):
-    hashed_password = hash_password(user.password)
+def create_user(db: Session, user: schemas.UserCreate, hashed_password: Optional[str] = None):
+    if hashed_password is None:
+        hashed_password = hash_password(user.password)
     user_data = user.model_dump()
     user_data["password"] = hashed_password
 
@@ -28,8 +83,32 @@ def get_user(db: Session, user_id: int):
     return None
 
 
-def get_users(db: Session, skip: int = 0, limit: int = 10):
-    users = db.query(models.User).offset(skip).limit(limit).all()
+def _id_chunks(ids: list):
+    for start in range(0, len(ids), MULTI_GET_CHUNK):
+        yield ids[start:start + MULTI_GET_CHUNK]
+
+
+# Multi-get: satu query IN (...) per chunk, hasil diurutkan ulang sesuai ids
+def get_users_by_ids(db: Session, ids: list, fields: Optional[tuple] = None):
+    found = {}
+    for chunk in _id_chunks(ids):
+        found.update((user.id, user) for user in _projected(db, models.User, fields).filter(models.User.id.in_(chunk)))
+    return [found[user_id] for user_id in ids if user_id in found], [user_id for user_id in ids if user_id not in found]
+
+
+def get_user_version(db: Session, user_id: int):
+    return db.query(models.User.id, models.User.version, models.User.updated_at).filter(
+        models.User.id == user_id
+    ).first()
+
+
+def get_users(db: Session, skip: int = 0, limit: int = 10, after: Optional[int] = None,
+              fields: Optional[tuple] = None):
+    query = _projected(db, models.User, fields)
+    if after is not None:
+        query = query.filter(models.User.id > after)
+        skip = 0
+    users = query.order_by(models.User.id).offset(skip).limit(limit).all()
     return users
 
 
@@ -42,6 +121,7 @@ def update_user(db: Session, user_id: int, user_update: schemas.UserUpdate):
         setattr(db_user, key, value)
 
     db.commit()
+    invalidate_principal(user_id)
     db.refresh(db_user)
     return db_user
 
@@ -55,10 +135,16 @@ def update_user_password(db: Session, user_id: int, password_update: schemas.Pas
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Incorrect current password"
         )
-    hashed_password = hash_password(password_update.new_password)
+    return set_user_password(db, user_id, hash_password(password_update.new_password))
+
+
+def set_user_password(db: Session, user_id: int, hashed_password: str):
+    db_user = db.query(models.User).filter(models.User.id == user_id).first()
+    if not db_user:
+        return None
     db_user.password = hashed_password
     db.commit()
-    db.refresh(db_user)
+    invalidate_principal(user_id)
     return {"message": "Password updated successfully"}
 
 
@@ -67,7 +153,10 @@ def delete_user(db: Session, user_id: int):
     if not user:
         return None
     db.delete(user)
+    # id bisa dipakai ulang oleh user baru (SQLite tanpa AUTOINCREMENT), jadi counter ikut dihapus
+    db.execute(delete(models.UserStats).where(models.UserStats.user_id == user_id))
     db.commit()
+    invalidate_principal(user_id)
     return {"message": "User Deleted successfully"}
 
 
@@ -76,16 +165,134 @@ def create_book(db: Session, book: schemas.BookCreate):
     db_book = models.Book(**book.model_dump())
     db.add(db_book)
     db.commit()
+    invalidate_books(membership_changed=True)
     db.refresh(db_book)
+    suggest.book_index.put(db_book.id, db_book.name, db_book.author)
     return db_book
 
 
-def get_book(db: Session, info: Optional[Union[int, str]], skip: int = 0, limit: int = 10):
-    query = db.query(models.Book)
+def _import_rows(source: BinaryIO, file_format: str) -> Iterator[tuple[int, object]]:
+    text = io.TextIOWrapper(source, encoding="utf-8-sig", newline="")
+    try:
+        if file_format == "csv":
+            reader = csv.DictReader(text)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for line_no, line in enumerate(text, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield line_no, json.loads(line)
+                except ValueError as exc:
+                    yield line_no, exc
+    finally:
+        text.detach()
+
+
+def _validation_message(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc']) or 'row'}: {error['msg']}"
+        for error in exc.errors()
+    )
+
+
+def _insert_book_chunk(db: Session, chunk: list, report):
+    isbns = [row["isbn"] for _, row in chunk]
+    existing = set(db.execute(select(models.Book.isbn).where(models.Book.isbn.in_(isbns))).scalars())
+    rows = []
+    for line_no, row in chunk:
+        if row["isbn"] in existing:
+            report(line_no, row["isbn"], "Duplicate ISBN")
+            continue
+        existing.add(row["isbn"])
+        rows.append((line_no, row))
+    if not rows:
+        return 0
+
+    try:
+        db.execute(insert(models.Book), [row for _, row in rows])
+        db.commit()
+        _index_imported(db, [row["isbn"] for _, row in rows])
+        return len(rows)
+    except IntegrityError:
+        # ISBN yang sama baru saja masuk dari request lain: ulangi per baris
+        db.rollback()
+
+    inserted = []
+    for line_no, row in rows:
+        try:
+            with db.begin_nested():
+                db.execute(insert(models.Book), row)
+            inserted.append(row["isbn"])
+        except IntegrityError:
+            report(line_no, row["isbn"], "Duplicate ISBN")
+    db.commit()
+    _index_imported(db, inserted)
+    return len(inserted)
+
+
+# executemany tidak mengembalikan id, jadi buku hasil import dibaca ulang lewat ISBN
+def _index_imported(db: Session, isbns: list):
+    if not isbns:
+        return
+    suggest.book_index.put_many(db.execute(
+        select(models.Book.id, models.Book.name, models.Book.author).where(models.Book.isbn.in_(isbns))
+    ))
+
+
+# Import massal dari file CSV/NDJSON, divalidasi dan di-insert per chunk (executemany).
+# Baris yang gagal dilaporkan tanpa membatalkan baris lain.
+def import_books(db: Session, source: BinaryIO, file_format: str, chunk_size: int = BOOK_IMPORT_CHUNK):
+    result = {"inserted": 0, "failed": 0, "errors": []}
+
+    def report(line_no, isbn, error):
+        result["failed"] += 1
+        if len(result["errors"]) < BOOK_IMPORT_MAX_ERRORS:
+            result["errors"].append({"row": line_no, "isbn": isbn, "error": error})
+
+    chunk = []
+    for line_no, raw in _import_rows(source, file_format):
+        if isinstance(raw, Exception):
+            report(line_no, None, f"Invalid JSON: {raw}")
+            continue
+        try:
+            book = schemas.BookCreate.model_validate(raw)
+        except ValidationError as exc:
+            isbn = raw.get("isbn") if isinstance(raw, dict) else None
+            report(line_no, isbn, _validation_message(exc))
+            continue
+        chunk.append((line_no, book.model_dump()))
+        if len(chunk) >= chunk_size:
+            result["inserted"] += _insert_book_chunk(db, chunk, report)
+            chunk = []
+    if chunk:
+        result["inserted"] += _insert_book_chunk(db, chunk, report)
+    if result["inserted"]:
+        invalidate_books(membership_changed=True)
+    return result
+
+
+def _book_query(query, info: Optional[Union[int, str]], skip: int, limit: int, after: Optional[int]):
+    if after is not None:
+        # Mode cursor: keyset pada id, tanpa OFFSET
+        query = query.filter(models.Book.id > after)
+        skip = 0
 
     if isinstance(info, int):
         query = query.filter(models.Book.id == info)
     elif isinstance(info, str):
+        match_query = search.build_match_query(info) if search.FTS_ENABLED else ""
+        if match_query:
+            query = (
+                query.join(search.book_fts, search.book_fts.c.rowid == models.Book.id)
+                .filter(search.match(match_query))
+            )
+            if after is not None:
+                query = query.filter(search.book_fts.c.rowid > after).order_by(search.book_fts.c.rowid)
+            else:
+                query = query.order_by(search.book_fts.c.rank)
+            return query.offset(skip).limit(limit)
         like_pattern = f"%{info}%"
         query = query.filter(
             or_(
@@ -94,18 +301,105 @@ def get_book(db: Session, info: Optional[Union[int, str]], skip: int = 0, limit:
             )
         )
 
-    return query.offset(skip).limit(limit).all()
+    return query.order_by(models.Book.id).offset(skip).limit(limit)
+
+
+def get_book(db: Session, info: Optional[Union[int, str]], skip: int = 0, limit: int = 10,
+             after: Optional[int] = None, fields: Optional[tuple] = None):
+    return _book_query(_projected(db, models.Book, fields), info, skip, limit, after).all()
+
+
+# Hanya (id, version, updated_at) untuk validasi ETag, tanpa memuat baris penuh
+def get_book_versions(db: Session, info: Optional[Union[int, str]], skip: int = 0, limit: int = 10,
+                      after: Optional[int] = None):
+    query = db.query(models.Book.id, models.Book.version, models.Book.updated_at)
+    return _book_query(query, info, skip, limit, after).all()
+
+
+def _same_versions(records, versions) -> bool:
+    return versions is None or list(map(conditional.row_version, records)) == list(map(conditional.row_version, versions))
+
+
+# Read-through cache di depan get_book, mengembalikan snapshot BookRecord.
+# versions (dari get_book_versions) dipakai untuk menolak entry cache yang sudah basi.
+# fields: hit cache tetap dipakai (proyeksi saat serialisasi); miss pencarian keyword
+# menjalankan query proyeksi langsung dan tidak disimpan ke cache
+def get_book_cached(db: Session, info: Union[int, str], skip: int = 0, limit: int = 10,
+                    after: Optional[int] = None, versions: Optional[list] = None,
+                    fields: Optional[tuple] = None):
+    if isinstance(info, int):
+        if skip or after is not None:
+            return [schemas.BookRecord.model_validate(book) for book in get_book(db, info, skip, limit, after)]
+        cached = book_cache.get(info)
+        if cached is not None and _same_versions([cached], versions):
+            return [cached]
+        generation = _book_cache_generation
+        books = [schemas.BookRecord.model_validate(book) for book in get_book(db, info)]
+        if books and generation == _book_cache_generation:
+            book_cache.set(info, books[0])
+        return books
+
+    key = (info.lower(), skip, limit, after)
+    cached = book_search_cache.get(key)
+    if cached is not None and _same_versions(cached, versions):
+        return list(cached)
+    if fields:
+        return get_book(db, info, skip, limit, after, fields)
+    # Generasi dicatat sebelum query supaya hasil yang basi karena write paralel tidak disimpan
+    generation = _book_cache_generation
+    books = [schemas.BookRecord.model_validate(book) for book in get_book(db, info, skip, limit, after)]
+    if generation == _book_cache_generation:
+        book_search_cache.set(key, books)
+    return list(books)
+
+
+def get_book_versions_by_ids(db: Session, ids: list):
+    versions = []
+    for chunk in _id_chunks(ids):
+        versions += db.query(models.Book.id, models.Book.version, models.Book.updated_at).filter(
+            models.Book.id.in_(chunk)
+        ).all()
+    return versions
+
+
+# Multi-get lewat book_cache yang sama dengan get_book_cached; hanya id yang tidak ada di cache
+# (atau versinya basi menurut versions) yang diambil dari database
+def get_books_cached_by_ids(db: Session, ids: list, versions: Optional[list] = None):
+    current = None if versions is None else {row.id: conditional.row_version(row) for row in versions}
+    found = {}
+    for book_id in ids:
+        if current is not None and book_id not in current:
+            continue
+        cached = book_cache.get(book_id)
+        if cached is not None and (current is None or conditional.row_version(cached) == current[book_id]):
+            found[book_id] = cached
+
+    wanted = [book_id for book_id in ids if book_id not in found and (current is None or book_id in current)]
+    generation = _book_cache_generation
+    fetched = []
+    for chunk in _id_chunks(wanted):
+        fetched += [schemas.BookRecord.model_validate(book)
+                    for book in db.query(models.Book).filter(models.Book.id.in_(chunk))]
+    for book in fetched:
+        found[book.id] = book
+        if generation == _book_cache_generation:
+            book_cache.set(book.id, book)
+    return [found[book_id] for book_id in ids if book_id in found], [book_id for book_id in ids if book_id not in found]
 
 
 def update_book(db: Session, book_id: int, book_update: schemas.BookUpdate):
     db_book = db.query(models.Book).filter(models.Book.id == book_id).first()
 
     if db_book:
-        for key, value in book_update.model_dump(exclude_unset=True).items():
+        changes = book_update.model_dump(exclude_unset=True)
+        for key, value in changes.items():
             setattr(db_book, key, value)
 
         db.commit()
+        invalidate_books([book_id], membership_changed=bool({"name", "author"} & changes.keys()))
         db.refresh(db_book)
+        if {"name", "author"} & changes.keys():
+            suggest.book_index.put(book_id, db_book.name, db_book.author)
         return db_book
 
     else:
@@ -117,57 +411,363 @@ def delete_book(db: Session, book_id: int):
     if not book:
         return None
     db.delete(book)
+    db.execute(delete(models.BookStats).where(models.BookStats.book_id == book_id))
     db.commit()
+    invalidate_books([book_id])
+    suggest.book_index.remove(book_id)
     return {"message": "Book Deleted successfully"}
 
 
 # Borrowed
+def _borrowed_query(db: Session):
+    # Nama user & buku diambil lewat join pada relasi, jadi satu query per halaman
+    return (
+        db.query(
+            models.Borrowed.id,
+            models.User.name.label("user"),
+            models.Book.name.label("book"),
+            models.Borrowed.date_borrowed,
+            models.Borrowed.date_due
+        )
+        .outerjoin(models.Borrowed.user)
+        .outerjoin(models.Borrowed.book)
+    )
+
+
+# Tambah (bukan set) counter per id; satu executemany upsert per tabel
+def _upsert_counters(db: Session, model, key: str, deltas: dict):
+    if not deltas:
+        return
+    table = model.__table__
+    # Baris baru memakai delta yang dipotong di 0 (kembali tanpa baris counter tidak membuat -1);
+    # baris yang sudah ada ditambah delta aslinya lewat total_delta/active_delta
+    rows = [{key: entity_id, "total_borrows": max(total, 0), "active_loans": max(active, 0),
+             "total_delta": total, "active_delta": active}
+            for entity_id, (total, active) in deltas.items()]
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        statement = (sqlite if dialect == "sqlite" else postgresql).insert(table)
+        db.execute(statement.on_conflict_do_update(
+            index_elements=[key],
+            set_={
+                "total_borrows": table.c.total_borrows + bindparam("total_delta"),
+                "active_loans": table.c.active_loans + bindparam("active_delta"),
+            }
+        ), rows)
+        return
+    for row in rows:
+        updated = db.execute(
+            update(table)
+            .where(table.c[key] == row[key])
+            .values(total_borrows=table.c.total_borrows + row["total_delta"],
+                    active_loans=table.c.active_loans + row["active_delta"])
+        ).rowcount
+        if not updated:
+            db.execute(insert(table).values(
+                {key: row[key], "total_borrows": row["total_borrows"], "active_loans": row["active_loans"]}
+            ))
+
+
+# loans: pasangan (user_id, book_id); dipanggil sebelum commit di jalur pinjam/kembali
+def _bump_circulation(db: Session, loans, borrowed: bool):
+    step = 1 if borrowed else -1
+    per_book = Counter(book_id for _, book_id in loans if book_id is not None)
+    per_user = Counter(user_id for user_id, _ in loans if user_id is not None)
+    _upsert_counters(db, models.BookStats, "book_id",
+                     {book_id: (n if borrowed else 0, n * step) for book_id, n in per_book.items()})
+    _upsert_counters(db, models.UserStats, "user_id",
+                     {user_id: (n if borrowed else 0, n * step) for user_id, n in per_user.items()})
+
+
+# Kurangi stok secara kondisional + insert dalam satu transaksi; None kalau stok habis
 def create_borrowed(db: Session, borrowed: schemas.BorrowedCreate):
+    taken = db.execute(
+        update(models.Book)
+        .where(models.Book.id == borrowed.book_id, models.Book.stock > 0)
+        .values(stock=models.Book.stock - 1)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not taken:
+        db.rollback()
+        return None
+
     db_borrowed = models.Borrowed(**borrowed.model_dump())
     db.add(db_borrowed)
+    db.flush()
+    borrowed_id = db_borrowed.id
+    _bump_circulation(db, [(borrowed.user_id, borrowed.book_id)], borrowed=True)
     db.commit()
-    db.refresh(db_borrowed)
-    user = db.query(models.User).filter(models.User.id == db_borrowed.user_id).first()
-    book = db.query(models.Book).filter(models.Book.id == db_borrowed.book_id).first()
-    return {
-        "id": db_borrowed.id,
-        "user": user.name if user else None,
-        "book": book.name if book else None,
-        "date_borrowed": db_borrowed.date_borrowed,
-        "date_due": db_borrowed.date_due
-    }
+    invalidate_books([borrowed.book_id])
+    row = _borrowed_query(db).filter(models.Borrowed.id == borrowed_id).first()
+    return dict(row._mapping)
 
 
-def get_borrowed_records(db: Session, book_id: int = None, user_id: int = None, skip: int = 0, limit: int = 10):
-    query = db.query(models.Borrowed)
+def get_borrowed_records(db: Session, book_id: int = None, user_id: int = None, skip: int = 0, limit: int = 10,
+                         after: Optional[int] = None):
+    query = _borrowed_query(db)
+    if after is not None:
+        query = query.filter(models.Borrowed.id > after)
+        skip = 0
     if book_id is not None:
         query = query.filter(models.Borrowed.book_id == book_id)
     if user_id is not None:
         query = query.filter(models.Borrowed.user_id == user_id)
-    borrowed = query.offset(skip).limit(limit).all()
-    result = []
-    for b in borrowed:
-        user = db.query(models.User).filter(models.User.id == b.user_id).first()
-        book = db.query(models.Book).filter(models.Book.id == b.book_id).first()
-        result.append({
-            "id": b.id,
-            "user": user.name if user else None,
-            "book": book.name if book else None,
-            "date_borrowed": b.date_borrowed,
-            "date_due": b.date_due
-        })
-    return result
+    borrowed = query.order_by(models.Borrowed.id).offset(skip).limit(limit).all()
+    return [dict(b._mapping) for b in borrowed]
 
 
-def delete_borrowed(db: Session, borrowed_id: int):
-    borrowed = db.query(models.Borrowed).filter(models.Borrowed.id == borrowed_id).first()
-    if not borrowed:
+# Hapus record + kembalikan stok dalam satu transaksi; None kalau record tidak ada
+def return_borrowed(db: Session, borrowed_id: int):
+    loan = _delete_borrowed_rows(db, [borrowed_id]).get(borrowed_id)
+    if loan is None:
+        db.rollback()
         return None
-    db.delete(borrowed)
+    _, book_id = loan
+
+    restored = db.execute(
+        update(models.Book)
+        .where(models.Book.id == book_id)
+        .values(stock=models.Book.stock + 1)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not restored:
+        db.rollback()
+        raise HTTPException(status_code=404, detail="Book not found")
+    _bump_circulation(db, [loan], borrowed=False)
     db.commit()
+    invalidate_books([book_id])
     return {"message": "Borrowed record deleted successfully"}
 
 
+# Kurangi stok beberapa buku sekaligus (n eksemplar per buku); hasilnya id buku yang berhasil
+def _take_stock(db: Session, counts: dict) -> set:
+    if db.get_bind().dialect.update_returning:
+        amount = case(counts, value=models.Book.id)
+        return set(db.scalars(
+            update(models.Book)
+            .where(models.Book.id.in_(counts), models.Book.stock >= amount)
+            .values(stock=models.Book.stock - amount)
+            .returning(models.Book.id)
+            .execution_options(synchronize_session=False)
+        ))
+    # Tanpa RETURNING tidak bisa tahu baris mana yang lolos, jadi satu UPDATE per buku
+    return {
+        book_id for book_id, n in counts.items()
+        if db.execute(
+            update(models.Book)
+            .where(models.Book.id == book_id, models.Book.stock >= n)
+            .values(stock=models.Book.stock - n)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+    }
+
+
+def _restore_stock(db: Session, counts: dict):
+    if not counts:
+        return
+    amount = case(counts, value=models.Book.id)
+    db.execute(
+        update(models.Book)
+        .where(models.Book.id.in_(counts))
+        .values(stock=models.Book.stock + amount)
+        .execution_options(synchronize_session=False)
+    )
+
+
+# Hapus record peminjaman; hasilnya {borrowed_id: (user_id, book_id)} untuk yang benar-benar terhapus
+def _delete_borrowed_rows(db: Session, borrowed_ids) -> dict:
+    columns = (models.Borrowed.id, models.Borrowed.user_id, models.Borrowed.book_id)
+    if db.get_bind().dialect.delete_returning:
+        rows = db.execute(
+            delete(models.Borrowed).where(models.Borrowed.id.in_(borrowed_ids)).returning(*columns)
+        ).all()
+        return {borrowed_id: (user_id, book_id) for borrowed_id, user_id, book_id in rows}
+    found = db.execute(select(*columns).where(models.Borrowed.id.in_(borrowed_ids))).all()
+    return {
+        borrowed_id: (user_id, book_id) for borrowed_id, user_id, book_id in found
+        if db.execute(delete(models.Borrowed).where(models.Borrowed.id == borrowed_id)).rowcount
+    }
+
+
+def _borrow_status(book_id, failed: set, existing: set) -> str:
+    if book_id not in failed:
+        return "rolled_back"
+    return "out_of_stock" if book_id in existing else "not_found"
+
+
+# Pinjam banyak buku dalam satu transaksi: satu UPDATE stok, satu INSERT, satu SELECT hasil.
+# Buku yang diminta lebih dari sekali dihitung sebagai beberapa eksemplar.
+def create_borrowed_batch(db: Session, batch: schemas.BorrowedBatchCreate) -> dict:
+    if db.get(models.User, batch.user_id) is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    counts = Counter(batch.book_ids)
+    taken = _take_stock(db, counts)
+    failed = set(counts) - taken
+    existing = set(db.scalars(select(models.Book.id).where(models.Book.id.in_(failed)))) if failed else set()
+
+    if failed and batch.atomic:
+        db.rollback()
+        return {"committed": False, "items": [
+            {"id": book_id, "status": _borrow_status(book_id, failed, existing)}
+            for book_id in batch.book_ids
+        ]}
+    if not taken:
+        # Tidak ada yang berhasil (atomic=false): executemany dengan list kosong jadi INSERT DEFAULT VALUES
+        db.rollback()
+        return {"committed": True, "items": [
+            {"id": book_id, "status": _borrow_status(book_id, failed, existing)}
+            for book_id in batch.book_ids
+        ]}
+
+    # Core executemany + RETURNING -> satu INSERT multi-row (flush ORM di SQLite jadi satu INSERT per baris)
+    inserted = db.execute(insert(models.Borrowed).returning(models.Borrowed.id, models.Borrowed.book_id), [
+        {"user_id": batch.user_id, "book_id": book_id,
+         "date_borrowed": batch.date_borrowed, "date_due": batch.date_due}
+        for book_id in batch.book_ids if book_id in taken
+    ]).all()
+    rows = {row.id: dict(row._mapping)
+            for row in _borrowed_query(db).filter(models.Borrowed.id.in_([row.id for row in inserted]))}
+    _bump_circulation(db, [(batch.user_id, row.book_id) for row in inserted], borrowed=True)
+    db.commit()
+    invalidate_books(taken)
+
+    # Urutan RETURNING tidak dijamin; record untuk buku yang sama identik, jadi cukup dipasangkan per buku
+    created = {}
+    for borrowed_id, book_id in sorted(inserted):
+        created.setdefault(book_id, []).append(borrowed_id)
+    items = []
+    for book_id in batch.book_ids:
+        if book_id in taken:
+            items.append({"id": book_id, "status": "borrowed", "borrowed": rows[created[book_id].pop(0)]})
+        else:
+            items.append({"id": book_id, "status": _borrow_status(book_id, failed, existing)})
+    return {"committed": True, "items": items}
+
+
+# Kembalikan banyak peminjaman dalam satu transaksi: satu DELETE ... RETURNING + satu UPDATE stok
+def return_borrowed_batch(db: Session, batch: schemas.BorrowedBatchReturn) -> dict:
+    requested = list(dict.fromkeys(batch.borrowed_ids))
+    rows = {row.id: dict(row._mapping)
+            for row in _borrowed_query(db).filter(models.Borrowed.id.in_(requested))}
+    deleted = _delete_borrowed_rows(db, requested)
+    missing = set(requested) - set(deleted)
+
+    if missing and batch.atomic:
+        db.rollback()
+        return {"committed": False, "items": [
+            {"id": borrowed_id, "status": "not_found" if borrowed_id in missing else "rolled_back"}
+            for borrowed_id in batch.borrowed_ids
+        ]}
+
+    # Record yang bukunya sudah dihapus tetap boleh dikembalikan, stoknya saja yang dilewati
+    book_ids = [book_id for _, book_id in deleted.values()]
+    _restore_stock(db, Counter(book_ids))
+    _bump_circulation(db, deleted.values(), borrowed=False)
+    db.commit()
+    invalidate_books(set(book_ids))
+
+    items = []
+    seen = set()
+    for borrowed_id in batch.borrowed_ids:
+        if borrowed_id in seen:
+            items.append({"id": borrowed_id, "status": "duplicate"})
+        elif borrowed_id in deleted:
+            items.append({"id": borrowed_id, "status": "returned", "borrowed": rows.get(borrowed_id)})
+        else:
+            items.append({"id": borrowed_id, "status": "not_found"})
+        seen.add(borrowed_id)
+    return {"committed": True, "items": items}
+
+
+# Statistik sirkulasi: baca dari tabel counter, top-N lewat index (total_borrows/active_loans)
+STATS_ORDER = {"borrows": "total_borrows", "active": "active_loans"}
+
+
+def _book_stats_query():
+    copies = models.Book.stock + models.BookStats.active_loans
+    return select(
+        models.BookStats.book_id, models.Book.name, models.BookStats.total_borrows,
+        models.BookStats.active_loans, models.Book.stock, copies.label("copies")
+    ).join(models.Book, models.Book.id == models.BookStats.book_id)
+
+
+def _user_stats_query():
+    return select(
+        models.UserStats.user_id, models.User.name, models.UserStats.total_borrows, models.UserStats.active_loans
+    ).join(models.User, models.User.id == models.UserStats.user_id)
+
+
+def _book_stats_row(row) -> dict:
+    stats = dict(row._mapping)
+    stats["utilisation"] = stats["active_loans"] / stats["copies"] if stats["copies"] else 0.0
+    return stats
+
+
+def top_books(db: Session, by: str = "borrows", limit: int = 10):
+    column = getattr(models.BookStats, STATS_ORDER[by])
+    rows = db.execute(_book_stats_query().order_by(column.desc(), models.BookStats.book_id.desc()).limit(limit))
+    return [_book_stats_row(row) for row in rows]
+
+
+def get_book_stats(db: Session, book_id: int):
+    book = db.get(models.Book, book_id)
+    if book is None:
+        return None
+    row = db.execute(_book_stats_query().where(models.BookStats.book_id == book_id)).first()
+    if row is None:
+        # Belum pernah dipinjam
+        return {"book_id": book.id, "name": book.name, "total_borrows": 0, "active_loans": 0,
+                "stock": book.stock, "copies": book.stock, "utilisation": 0.0}
+    return _book_stats_row(row)
+
+
+def top_users(db: Session, by: str = "active", limit: int = 10):
+    column = getattr(models.UserStats, STATS_ORDER[by])
+    rows = db.execute(_user_stats_query().order_by(column.desc(), models.UserStats.user_id.desc()).limit(limit))
+    return [dict(row._mapping) for row in rows]
+
+
+def get_user_stats(db: Session, user_id: int):
+    row = db.execute(_user_stats_query().where(models.UserStats.user_id == user_id)).first()
+    if row is not None:
+        return dict(row._mapping)
+    user = db.get(models.User, user_id)
+    if user is None:
+        return None
+    return {"user_id": user.id, "name": user.name, "total_borrows": 0, "active_loans": 0}
+
+
+# Hitung ulang counter dari tabel borrowed. active_loans selalu tepat; total_borrows tidak bisa
+# dihitung ulang karena record yang sudah dikembalikan dihapus, jadi nilai lama dipertahankan
+# (minimal sama dengan active_loans)
+def rebuild_circulation_stats(db: Session) -> dict:
+    result = {}
+    for model, key, column, parent in (
+        (models.BookStats, "book_id", models.Borrowed.book_id, models.Book),
+        (models.UserStats, "user_id", models.Borrowed.user_id, models.User),
+    ):
+        # Join ke tabel induk: id buku/user yang sudah dihapus ikut terbuang
+        active = dict(db.execute(
+            select(column, func.count()).join(parent, parent.id == column).group_by(column)
+        ).all())
+        key_column = getattr(model, key)
+        totals = dict(db.execute(
+            select(key_column, model.total_borrows).join(parent, parent.id == key_column)
+        ).all())
+        db.execute(delete(model))
+        rows = [
+            {key: entity_id, "active_loans": active.get(entity_id, 0),
+             "total_borrows": max(totals.get(entity_id, 0), active.get(entity_id, 0))}
+            for entity_id in set(active) | set(totals)
+        ]
+        if rows:
+            db.execute(insert(model), rows)
+        result[model.__tablename__] = len(rows)
+    db.commit()
+    return result
+
+
 def get_borrowed(db, borrowed_id):
     borrowed = db.query(models.Borrowed).filter(models.Borrowed.id == borrowed_id).first()
     if not borrowed:
@@ -179,3 +779,60 @@ def get_borrowed(db, borrowed_id):
         "date_borrowed": borrowed.date_borrowed,
         "date_due": borrowed.date_due
     }
+
+
+# Export
+def _export_statement(table: str):
+    if table == "books":
+        return select(
+            models.Book.id, models.Book.name, models.Book.author, models.Book.isbn,
+            models.Book.date, models.Book.stock
+        ).order_by(models.Book.id)
+    if table == "users":
+        # Tanpa kolom password
+        return select(
+            models.User.id, models.User.name, models.User.username, models.User.address,
+            models.User.phone, models.User.email, models.User.role
+        ).order_by(models.User.id)
+    if table == "borrowed":
+        return (
+            select(
+                models.Borrowed.id, models.Borrowed.user_id, models.User.name.label("user"),
+                models.Borrowed.book_id, models.Book.name.label("book"),
+                models.Borrowed.date_borrowed, models.Borrowed.date_due
+            )
+            .outerjoin(models.Borrowed.user)
+            .outerjoin(models.Borrowed.book)
+            .order_by(models.Borrowed.id)
+        )
+    raise ValueError(f"Unknown export table: {table}")
+
+
+def export_columns(table: str) -> list:
+    return list(_export_statement(table).selected_columns.keys())
+
+
+# Peminjaman yang terlambat minimal min_days hari per as_of, satu query berurutan per user
+# (index date_due, user_id untuk filter); dikirim per batch lewat yield_per
+def overdue_loans(db: Session, as_of: date, min_days: int = 1, batch_size: int = EXPORT_BATCH_SIZE):
+    statement = (
+        select(
+            models.Borrowed.user_id, models.User.name.label("user"), models.User.email,
+            models.Borrowed.id.label("borrowed_id"), models.Borrowed.book_id, models.Book.name.label("book"),
+            models.Borrowed.date_borrowed, models.Borrowed.date_due
+        )
+        .outerjoin(models.User, models.User.id == models.Borrowed.user_id)
+        .outerjoin(models.Book, models.Book.id == models.Borrowed.book_id)
+        .where(models.Borrowed.date_due <= as_of - timedelta(days=min_days))
+        .order_by(models.Borrowed.user_id, models.Borrowed.date_due, models.Borrowed.id)
+        .execution_options(yield_per=batch_size)
+    )
+    for partition in db.execute(statement).partitions():
+        yield partition
+
+
+# Baris tabel per batch lewat cursor server-side (yield_per), memori konstan
+def export_rows(db: Session, table: str, batch_size: int = EXPORT_BATCH_SIZE):
+    result = db.execute(_export_statement(table).execution_options(yield_per=batch_size))
+    for partition in result.partitions():
+        yield partition
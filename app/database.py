@@ -1,22 +1,219 @@
 import os
+import threading
+import time
+from typing import Union
 
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from starlette.concurrency import run_in_threadpool
+
+from app import metrics, profiling
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
-if not DATABASE_URL:
-    raise ValueError("DATABASE_URL is not set in environment variables")
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# DATABASE_ASYNC=true -> request memakai AsyncEngine/AsyncSession (aiosqlite untuk SQLite)
+DATABASE_ASYNC = os.getenv("DATABASE_ASYNC", "false").lower() in ("1", "true", "yes")
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+if not ASYNC_DATABASE_URL and DATABASE_URL and DATABASE_URL.startswith("sqlite://"):
+    ASYNC_DATABASE_URL = DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
+
+# SQLITE_PROFILE=production -> WAL + pragma di bawah; legacy -> perilaku default SQLite
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "production").lower()
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# DB_INIT_SCHEMA=true -> create_all/migrasi dijalankan saat startup; default lewat `python -m app.migrate`
+DB_INIT_SCHEMA = os.getenv("DB_INIT_SCHEMA", "false").lower() in ("1", "true", "yes")
+
+
+def _is_sqlite_memory(url: str) -> bool:
+    return url.split("?")[0].rstrip("/").endswith((":memory:", "sqlite:", "aiosqlite:"))
+
+
+# Pool yang mencatat lama menunggu koneksi (termasuk membuka koneksi baru) ke metrics
+def _timed_pool(base):
+    class TimedPool(base):
+        def _do_get(self):
+            start = time.perf_counter()
+            try:
+                return super()._do_get()
+            finally:
+                metrics.pool_checkout_wait.observe(time.perf_counter() - start)
+
+    TimedPool.__name__ = f"Timed{base.__name__}"
+    return TimedPool
+
+
+TimedQueuePool = _timed_pool(QueuePool)
+TimedAsyncQueuePool = _timed_pool(AsyncAdaptedQueuePool)
+
+
+def _engine_options(url: str, poolclass=TimedQueuePool) -> dict:
+    options = {}
+    if url.startswith("sqlite"):
+        options["connect_args"] = {"check_same_thread": False}
+        if _is_sqlite_memory(url):
+            return options
+    options.update(poolclass=poolclass, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW,
+                   pool_timeout=DB_POOL_TIMEOUT)
+    return options
+
+
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        # Nilai negatif = ukuran dalam KiB
+        cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+    finally:
+        cursor.close()
+
+
+def configure_engine(sync_engine):
+    profiling.instrument(sync_engine)
+    if sync_engine.dialect.name == "sqlite" and SQLITE_PROFILE == "production":
+        event.listen(sync_engine, "connect", _sqlite_pragmas)
+    return sync_engine
+
+
 Base = declarative_base()
 
+# Engine dibuat saat pertama dipakai, bukan saat import; `database.engine`/`SessionLocal`
+# tetap bisa diakses seperti atribut biasa lewat __getattr__ di bawah
+_engine = None
+_session_factory = None
+_async_engine = None
+_async_session_factory = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    global _engine, _session_factory
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                if not DATABASE_URL:
+                    raise ValueError("DATABASE_URL is not set in environment variables")
+                engine = configure_engine(create_engine(DATABASE_URL, **_engine_options(DATABASE_URL)))
+                _session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+                _engine = engine
+    return _engine
+
+
+def get_sessionmaker():
+    get_engine()
+    return _session_factory
+
+
+def get_async_engine():
+    global _async_engine, _async_session_factory
+    if not DATABASE_ASYNC:
+        return None
+    if _async_engine is None:
+        with _engine_lock:
+            if _async_engine is None:
+                if not ASYNC_DATABASE_URL:
+                    raise ValueError("ASYNC_DATABASE_URL is not set in environment variables")
+                engine = create_async_engine(ASYNC_DATABASE_URL,
+                                             **_engine_options(ASYNC_DATABASE_URL, TimedAsyncQueuePool))
+                configure_engine(engine.sync_engine)
+                # expire_on_commit=False: atribut objek hasil crud tetap bisa dibaca di luar run_sync
+                _async_session_factory = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+                _async_engine = engine
+    return _async_engine
+
+
+def get_async_sessionmaker():
+    get_async_engine()
+    return _async_session_factory
+
+
+def __getattr__(name):
+    if name == "engine":
+        return get_engine()
+    if name == "SessionLocal":
+        return get_sessionmaker()
+    if name == "async_engine":
+        return get_async_engine()
+    if name == "AsyncSessionLocal":
+        return get_async_sessionmaker()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Tutup engine yang sudah terlanjur dibuat saja (dipanggil saat shutdown)
+async def dispose_engines():
+    if _async_engine is not None:
+        # Koneksi aiosqlite memakai thread non-daemon; tutup supaya proses bisa berhenti
+        await _async_engine.dispose()
+    if _engine is not None:
+        _engine.dispose()
+
+
+DBSession = Union[Session, AsyncSession]
+
+
+# create_all() tidak menambah kolom ke tabel lama; tambahkan kolom baru yang punya server_default/nullable
+def add_missing_columns(bind, *tables):
+    inspector = inspect(bind)
+    with bind.begin() as conn:
+        for table in tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(bind.dialect)}"
+                if column.server_default is not None:
+                    ddl += f" DEFAULT {column.server_default.arg}"
+                    if not column.nullable:
+                        ddl += " NOT NULL"
+                conn.execute(text(ddl))
+
+
+# create_all() juga tidak membuat index baru pada tabel yang sudah ada
+def add_missing_indexes(bind, *tables):
+    inspector = inspect(bind)
+    for table in tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind=bind)
+
+
 def get_db():
-    db = SessionLocal()
+    db = get_sessionmaker()()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with get_async_sessionmaker()() as db:
+        yield db
+
+
+get_session = get_async_db if DATABASE_ASYNC else get_db
+
+
+# Jalankan fungsi crud (sync) tanpa memblokir event loop:
+# AsyncSession -> run_sync (I/O async lewat greenlet), Session -> threadpool
+async def run_db(db: DBSession, fn, *args, **kwargs):
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
@@ -1,15 +1,81 @@
-from dotenv import load_dotenv
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager, suppress
+
 from fastapi import FastAPI
-from .database import Base, engine
-from app.routers import book, user, borrowed
+from sqlalchemy import inspect
+from starlette.concurrency import run_in_threadpool
+
+from . import database, metrics, models, profiling, suggest
+from app.search import detect_book_search
+from app.routers import book, user, borrowed, export, stats
 from app.auth import login
+from app.responses import DefaultResponse
+from app.auth.utils import revocation_filter
+
+logger = logging.getLogger("app")
+
+
+# Semua akses database saat boot ada di sini, bukan saat import, supaya import app tetap ringan
+def startup():
+    start = time.perf_counter()
+    engine = database.get_engine()
+    if database.DB_INIT_SCHEMA:
+        from app.migrate import init_schema
+        init_schema(engine)
+    elif not inspect(engine).has_table(models.User.__tablename__):
+        raise RuntimeError("Database schema is not initialized: run `python -m app.migrate` "
+                           "or start with DB_INIT_SCHEMA=true")
+    detect_book_search(engine)
+    with database.get_sessionmaker()() as db:
+        revocation_filter.load(db)
+    logger.info("startup finished in %.1f ms", (time.perf_counter() - start) * 1000)
+
+
+def _refresh_suggestions():
+    with database.get_sessionmaker()() as db:
+        suggest.book_index.refresh(db)
+
+
+# Build pertama jalan di background supaya startup tidak menunggu (/books/suggest 503 sampai siap),
+# lalu refresh inkremental berkala supaya buku yang diubah lewat instance lain ikut masuk index
+async def refresh_suggestions():
+    while True:
+        try:
+            await run_in_threadpool(_refresh_suggestions)
+        except Exception:
+            logger.exception("suggestion index refresh failed")
+        if suggest.SUGGEST_REFRESH_SECONDS <= 0:
+            return
+        await asyncio.sleep(suggest.SUGGEST_REFRESH_SECONDS)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await run_in_threadpool(startup)
+    refresher = None
+    if suggest.SUGGEST_ENABLED:
+        refresher = asyncio.create_task(refresh_suggestions())
+    yield
+    if refresher is not None:
+        refresher.cancel()
+        with suppress(asyncio.CancelledError):
+            await refresher
+    await database.dispose_engines()
 
-load_dotenv()
-Base.metadata.create_all(bind=engine)
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan, default_response_class=DefaultResponse)
+if profiling.SQL_PROFILE:
+    app.add_middleware(profiling.SQLProfilerMiddleware)
+if metrics.METRICS_ENABLED:
+    # Ditambahkan terakhir = middleware terluar, latency mencakup middleware lain
+    app.add_middleware(metrics.MetricsMiddleware)
+    app.add_route("/metrics", metrics.metrics_endpoint, include_in_schema=False)
 
 app.include_router(user.router)
 app.include_router(borrowed.router)
 app.include_router(book.router)
-app.include_router(login.router)
\ No newline at end of file
+app.include_router(login.router)
+app.include_router(export.router)
+app.include_router(stats.router)
\ No newline at end of file
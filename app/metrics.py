@@ -0,0 +1,167 @@
+import hmac
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+# Metrik format teks Prometheus tanpa dependency tambahan; tiap instance di-scrape sendiri
+# /metrics tidak lewat auth user dan membuka latency per route, hit rate cache, pool, dll, jadi opt-in.
+# Kalau METRICS_TOKEN diisi, scraper wajib mengirim "Authorization: Bearer <token>"
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "false").lower() in ("1", "true", "yes")
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _labels(names, values) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{str(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # label values -> [hitungan per bucket (non-kumulatif, +Inf di akhir), sum]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def collect(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            snapshot = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        for labelvalues, counts, total in snapshot:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                labels = _labels(self.labelnames + ("le",), labelvalues + (le,))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _labels(self.labelnames, labelvalues)
+            yield f"{self.name}_sum{labels} {total}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class Gauge:
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        with self._lock:
+            self.value -= amount
+
+    def collect(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} gauge"
+        yield f"{self.name} {self.value}"
+
+
+request_duration = Histogram("http_request_duration_seconds", "HTTP request latency by route template",
+                             ("method", "route", "status"))
+requests_in_flight = Gauge("http_requests_in_flight", "HTTP requests currently being served")
+password_hash_duration = Histogram("password_hash_duration_seconds", "bcrypt hash/verify time",
+                                   ("operation",), buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0))
+pool_checkout_wait = Histogram("db_pool_checkout_wait_seconds", "Time spent waiting for a pooled DB connection",
+                               buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0))
+
+_metrics = [request_duration, requests_in_flight, password_hash_duration, pool_checkout_wait]
+_caches = {}
+
+
+# Cache yang punya stats() (LRUCache) ikut diekspor sebagai hit/miss/size/hit ratio
+def register_cache(name: str, cache):
+    _caches[name] = cache
+    return cache
+
+
+def _collect_caches():
+    stats = [(name, cache.stats()) for name, cache in _caches.items()]
+    for metric, key, kind, documentation in (
+        ("cache_hits_total", "hits", "counter", "Cache lookups that found an entry"),
+        ("cache_misses_total", "misses", "counter", "Cache lookups that missed"),
+        ("cache_size", "size", "gauge", "Entries currently cached"),
+        ("cache_hit_ratio", "hit_ratio", "gauge", "Hits / lookups since start"),
+    ):
+        yield f"# HELP {metric} {documentation}"
+        yield f"# TYPE {metric} {kind}"
+        for name, values in stats:
+            yield f'{metric}{{cache="{name}"}} {values[key]}'
+
+
+def render() -> str:
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.collect())
+    lines.extend(_collect_caches())
+    return "\n".join(lines) + "\n"
+
+
+async def metrics_endpoint(request: Request):
+    if METRICS_TOKEN and not hmac.compare_digest(
+            request.headers.get("authorization", "").encode(), f"Bearer {METRICS_TOKEN}".encode()):
+        return Response("Unauthorized", status_code=401, headers={"WWW-Authenticate": "Bearer"})
+    return Response(render(), media_type=CONTENT_TYPE)
+
+
+# Timing untuk fungsi yang jalan di executor bcrypt
+def timed_hash(operation: str, fn, *args):
+    start = time.perf_counter()
+    try:
+        return fn(*args)
+    finally:
+        password_hash_duration.observe(time.perf_counter() - start, operation)
+
+
+# Middleware ASGI murni; label route memakai template (/books/{book_info}), bukan path asli
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        requests_in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            requests_in_flight.dec()
+            route = scope.get("route")
+            # Path yang tidak cocok route mana pun digabung supaya jumlah series tetap terbatas
+            template = route.path if route is not None else "<unmatched>"
+            request_duration.observe(time.perf_counter() - start, scope["method"], template, status)
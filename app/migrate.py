@@ -0,0 +1,31 @@
+# Inisialisasi/migrasi skema database. Dijalankan sekali per deploy:
+#
+#   python -m app.migrate
+#
+# atau otomatis di startup setiap worker dengan DB_INIT_SCHEMA=true.
+from sqlalchemy import inspect
+from sqlalchemy.engine import Engine
+
+from app import crud, database, models
+from app.auth.utils import migrate_blacklist_autoincrement, migrate_blacklist_storage, purge_expired_tokens
+from app.search import init_book_search
+
+
+def init_schema(engine: Engine):
+    migrate_blacklist_storage(engine)
+    migrate_blacklist_autoincrement(engine)
+    # Tabel counter yang baru dibuat diisi dari data peminjaman yang sudah ada
+    new_stats = not inspect(engine).has_table(models.BookStats.__tablename__)
+    database.Base.metadata.create_all(bind=engine)
+    database.add_missing_columns(engine, models.Book.__table__, models.User.__table__)
+    database.add_missing_indexes(engine, models.Borrowed.__table__)
+    init_book_search(engine)
+    with database.get_sessionmaker()() as db:
+        purge_expired_tokens(db, exhaust=True)
+        if new_stats:
+            crud.rebuild_circulation_stats(db)
+
+
+if __name__ == "__main__":
+    init_schema(database.get_engine())
+    print(f"Schema ready: {database.get_engine().url.render_as_string(hide_password=True)}")
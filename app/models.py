@@ -1,9 +1,15 @@
 import enum
+from datetime import datetime, timezone
 
-from sqlalchemy import Column, Integer, String, ForeignKey, Date, Enum, DateTime
+from sqlalchemy import (Column, Integer, String, ForeignKey, Date, Enum, DateTime, Index, LargeBinary,
+                        literal_column)
 from sqlalchemy.orm import relationship
 from app.database import Base
 
+
+def _utcnow():
+    return datetime.now(timezone.utc)
+
 class RoleEnum(str, enum.Enum):
     admin = "admin"
     user = "customer"
@@ -19,6 +25,10 @@ class User(Base):
     phone = Column(String, nullable=False)
     email = Column(String, unique=True, index=True, nullable=False)
     role = Column(Enum(RoleEnum), default=RoleEnum.user)
+    # Naik otomatis di setiap UPDATE (ORM maupun Core), dipakai untuk ETag
+    version = Column(Integer, nullable=False, default=1, server_default="1",
+                     onupdate=literal_column("version") + 1)
+    updated_at = Column(DateTime, default=_utcnow, onupdate=_utcnow)
 
     # relasi ke Borrowed
     borrowed_books = relationship("Borrowed", back_populates="user")
@@ -32,6 +42,9 @@ class Book(Base):
     isbn = Column(String, unique=True, index=True, nullable=False)
     date = Column(Date, default=None)
     stock = Column(Integer, default=0)
+    version = Column(Integer, nullable=False, default=1, server_default="1",
+                     onupdate=literal_column("version") + 1)
+    updated_at = Column(DateTime, default=_utcnow, onupdate=_utcnow)
 
     # relasi ke Borrowed
     borrowed_by = relationship("Borrowed", back_populates="book")
@@ -48,10 +61,33 @@ class Borrowed(Base):
     user = relationship("User", back_populates="borrowed_books")
     book = relationship("Book", back_populates="borrowed_by")
 
+    # Laporan keterlambatan: range scan date_due, user_id ikut di index
+    __table_args__ = (Index("ix_borrowed_date_due_user_id", "date_due", "user_id"),)
+
+# Counter sirkulasi, diperbarui dalam transaksi yang sama dengan pinjam/kembali.
+# active_loans = jumlah baris borrowed saat ini; total_borrows = akumulasi sepanjang waktu
+class BookStats(Base):
+    __tablename__ = "book_stats"
+
+    book_id = Column(Integer, ForeignKey("book.id"), primary_key=True)
+    total_borrows = Column(Integer, nullable=False, default=0, server_default="0", index=True)
+    active_loans = Column(Integer, nullable=False, default=0, server_default="0", index=True)
+
+class UserStats(Base):
+    __tablename__ = "user_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    total_borrows = Column(Integer, nullable=False, default=0, server_default="0", index=True)
+    active_loans = Column(Integer, nullable=False, default=0, server_default="0", index=True)
+
 class BlacklistedToken(Base):
     __tablename__ = "blacklisted_tokens"
+    # id tidak boleh dipakai ulang setelah delete: RevocationFilter.refresh membaca baris dengan id > id terakhir
+    __table_args__ = {"sqlite_autoincrement": True}
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, nullable=False)
-    token = Column(String, unique=True, nullable=False)
+    # SHA-256 dari token (32 byte), bukan string JWT utuh
+    token_hash = Column(LargeBinary(32), unique=True, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
     blacklisted_at = Column(DateTime)
\ No newline at end of file
@@ -0,0 +1,69 @@
+import base64
+import binascii
+import json
+from typing import Callable, Optional
+
+from fastapi import HTTPException, status
+
+
+# Cursor opaque berisi primary key baris terakhir di halaman sebelumnya
+def encode_cursor(last_id: int) -> str:
+    raw = json.dumps({"id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[int]:
+    if cursor is None:
+        return None
+    if cursor == "":
+        # ?after= tanpa nilai: mode cursor dari halaman pertama
+        return 0
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        last_id = json.loads(base64.urlsafe_b64decode(padded))["id"]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        last_id = None
+    if not isinstance(last_id, int) or isinstance(last_id, bool) or last_id < 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    return last_id
+
+
+def page(items: list, limit: int, key: Callable = lambda item: item.id):
+    next_cursor = None
+    if items and len(items) >= limit:
+        next_cursor = encode_cursor(key(items[-1]))
+    return {"items": items, "next_cursor": next_cursor}
+
+
+# "?ids=3,1,2" -> [3, 1, 2]; duplikat dibuang, urutan permintaan dipertahankan
+def parse_ids(raw: str, max_ids: int) -> list[int]:
+    try:
+        ids = list(dict.fromkeys(int(part) for part in raw.split(",") if part.strip()))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ids must be a comma-separated list of integers"
+        )
+    if not ids or len(ids) > max_ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"ids must contain between 1 and {max_ids} ids"
+        )
+    return ids
+
+
+# "?fields=name,stock" -> ("id", "name", "stock"); id selalu ikut karena dipakai cursor dan ETag
+def parse_fields(raw: Optional[str], allowed: tuple) -> Optional[tuple]:
+    if raw is None:
+        return None
+    requested = [part.strip() for part in raw.split(",") if part.strip()]
+    unknown = [name for name in requested if name not in allowed]
+    if unknown or not requested:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid fields: {', '.join(unknown) or '(empty)'}; allowed: {', '.join(allowed)}"
+        )
+    return tuple(dict.fromkeys(["id", *requested]))
@@ -0,0 +1,146 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+
+# SQL_PROFILE=true -> middleware log JSON per request + warning N+1 (default mati: ada overhead per request)
+SQL_PROFILE = os.getenv("SQL_PROFILE", "false").lower() in ("1", "true", "yes")
+# Header Server-Timing membocorkan waktu DB/jumlah query ke client, jadi opt-in terpisah
+SQL_PROFILE_HEADER = os.getenv("SQL_PROFILE_HEADER", "false").lower() in ("1", "true", "yes")
+# Statement identik yang jalan sebanyak ini dalam satu request dicurigai N+1
+SQL_N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "5"))
+
+logger = logging.getLogger("app.sql")
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def record(self, statement: str, elapsed: float):
+        self.count += 1
+        self.duration += elapsed
+        self.statements[statement] += 1
+
+    def repeated(self, threshold: int = SQL_N_PLUS_ONE_THRESHOLD):
+        return [(statement, n) for statement, n in self.statements.most_common() if n >= threshold]
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("sql_query_stats", default=None)
+# Collector query_budget() yang aktif; global supaya ikut menghitung query dari thread lain (TestClient)
+_budgets = []
+_budgets_lock = threading.Lock()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info["query_start"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info.pop("query_start", time.perf_counter())
+    stats = _current.get()
+    if stats is not None:
+        stats.record(statement, elapsed)
+    for budget in _budgets:
+        budget.record(statement, elapsed)
+
+
+def instrument(sync_engine):
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    return sync_engine
+
+
+def _short(statement: str, size: int = 200) -> str:
+    statement = " ".join(statement.split())
+    return statement if len(statement) <= size else statement[:size] + "..."
+
+
+# Middleware ASGI murni: jumlah query + waktu DB per request ke log JSON (dan Server-Timing kalau diaktifkan)
+class SQLProfilerMiddleware:
+    def __init__(self, app, server_timing: bool = SQL_PROFILE_HEADER):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current.set(stats)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    total_ms = (time.perf_counter() - start) * 1000
+                    MutableHeaders(scope=message).append(
+                        "Server-Timing",
+                        f'db;dur={stats.duration * 1000:.2f};desc="{stats.count} queries", app;dur={total_ms:.2f}'
+                    )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            self._log(scope, status, stats, time.perf_counter() - start)
+
+    @staticmethod
+    def _log(scope, status, stats: QueryStats, elapsed: float):
+        route = scope.get("route")
+        record = {
+            "method": scope["method"],
+            "route": getattr(route, "path", scope["path"]),
+            "status": status,
+            "duration_ms": round(elapsed * 1000, 2),
+            "queries": stats.count,
+            "db_ms": round(stats.duration * 1000, 2),
+        }
+        repeated = stats.repeated()
+        if repeated:
+            record["n_plus_one"] = [{"statement": _short(statement), "count": n} for statement, n in repeated]
+            logger.warning(json.dumps(record))
+        elif logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps(record))
+
+
+# Helper untuk test: gagal kalau blok ini menjalankan lebih dari max_queries query
+# (atau statement identik lebih dari max_repeats kali)
+#
+#   with query_budget(2):
+#       client.get("/books/1")
+@contextmanager
+def query_budget(max_queries: int, max_repeats: Optional[int] = None):
+    stats = QueryStats()
+    with _budgets_lock:
+        _budgets.append(stats)
+    try:
+        yield stats
+    finally:
+        with _budgets_lock:
+            _budgets.remove(stats)
+
+    problems = []
+    if stats.count > max_queries:
+        problems.append(f"{stats.count} queries executed, budget is {max_queries}")
+    if max_repeats is not None:
+        problems += [f"statement executed {n}x (max {max_repeats}): {_short(statement)}"
+                     for statement, n in stats.repeated(max_repeats + 1)]
+    if problems:
+        listing = "\n".join(f"  {n}x {_short(statement)}" for statement, n in stats.statements.most_common())
+        raise AssertionError("; ".join(problems) + "\n" + listing)
@@ -0,0 +1,97 @@
+# Laporan untuk job malam, tanpa lewat HTTP:
+#
+#   python -m app.reports overdue --as-of 2024-06-01 --format csv --output overdue.csv
+#   python -m app.reports rebuild-stats
+import argparse
+import csv
+import io
+import json
+import sys
+from datetime import date
+from typing import Iterator
+
+from sqlalchemy.orm import Session
+
+from app import crud
+
+OVERDUE_CSV_COLUMNS = ["user_id", "user", "email", "borrowed_id", "book_id", "book",
+                       "date_borrowed", "date_due", "days_overdue"]
+
+
+# Baris sudah urut per user, jadi pengelompokan cukup satu lintasan tanpa menampung semua user
+def overdue_by_user(db: Session, as_of: date, min_days: int = 1) -> Iterator[dict]:
+    current = None
+    for rows in crud.overdue_loans(db, as_of, min_days):
+        for row in rows:
+            if current is None or row.user_id != current["user_id"]:
+                if current is not None:
+                    yield current
+                current = {"user_id": row.user_id, "user": row.user, "email": row.email,
+                           "overdue": 0, "max_days_overdue": 0, "loans": []}
+            days = (as_of - row.date_due).days
+            current["overdue"] += 1
+            current["max_days_overdue"] = max(current["max_days_overdue"], days)
+            current["loans"].append({
+                "borrowed_id": row.borrowed_id, "book_id": row.book_id, "book": row.book,
+                "date_borrowed": row.date_borrowed.isoformat(), "date_due": row.date_due.isoformat(),
+                "days_overdue": days,
+            })
+    if current is not None:
+        yield current
+
+
+# NDJSON: satu baris per user; CSV: satu baris per peminjaman
+def overdue_ndjson(db: Session, as_of: date, min_days: int = 1) -> Iterator[str]:
+    for group in overdue_by_user(db, as_of, min_days):
+        yield json.dumps(group) + "\n"
+
+
+def overdue_csv(db: Session, as_of: date, min_days: int = 1) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(OVERDUE_CSV_COLUMNS)
+    for group in overdue_by_user(db, as_of, min_days):
+        for loan in group["loans"]:
+            writer.writerow([group["user_id"], group["user"], group["email"], loan["borrowed_id"],
+                             loan["book_id"], loan["book"], loan["date_borrowed"], loan["date_due"],
+                             loan["days_overdue"]])
+        if buffer.tell() >= 64 * 1024:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+OVERDUE_FORMATS = {"ndjson": overdue_ndjson, "csv": overdue_csv}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.reports", description="Library reports")
+    commands = parser.add_subparsers(dest="command", required=True)
+    overdue = commands.add_parser("overdue", help="overdue loans grouped by user")
+    overdue.add_argument("--as-of", type=date.fromisoformat, default=date.today())
+    overdue.add_argument("--min-days", type=int, default=1)
+    overdue.add_argument("--format", choices=sorted(OVERDUE_FORMATS), default="ndjson")
+    overdue.add_argument("--output", help="file path, default stdout")
+    commands.add_parser("rebuild-stats", help="recompute circulation counters from the borrowed table")
+    args = parser.parse_args(argv)
+
+    from app import database
+
+    if args.command == "rebuild-stats":
+        with database.get_sessionmaker()() as db:
+            print(json.dumps(crud.rebuild_circulation_stats(db)))
+        return
+
+    out = open(args.output, "w", newline="") if args.output else sys.stdout
+    try:
+        with database.get_sessionmaker()() as db:
+            for chunk in OVERDUE_FORMATS[args.format](db, args.as_of, args.min_days):
+                out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+from functools import lru_cache
+from typing import Any, Optional
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+try:
+    import orjson
+except ImportError:  # orjson opsional, fallback ke json stdlib
+    orjson = None
+
+if orjson is not None:
+    from fastapi.responses import ORJSONResponse as DefaultResponse
+else:
+    DefaultResponse = JSONResponse
+
+
+@lru_cache(maxsize=None)
+def _adapter(schema) -> TypeAdapter:
+    return TypeAdapter(schema)
+
+
+# Jalur cepat untuk list endpoint: satu validasi (from_attributes) lalu langsung ke bytes JSON
+# di pydantic-core, tanpa jsonable_encoder dan tanpa validasi ulang oleh response_model
+def typed_json(schema, content: Any, headers: Optional[dict] = None, status_code: int = 200) -> Response:
+    adapter = _adapter(schema)
+    body = adapter.dump_json(adapter.validate_python(content, from_attributes=True))
+    return Response(content=body, status_code=status_code, headers=headers, media_type="application/json")
@@ -1,16 +1,26 @@
-from typing import Union
+import tempfile
+from typing import Optional, Union
 
-from fastapi import APIRouter, Depends, HTTPException, Path
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request
 
-from app import schemas, database, crud
+from app import schemas, database, crud, pagination, conditional, suggest
+from app.responses import typed_json
 from app.auth.dependencies import get_current_user
 
 router = APIRouter(prefix="/books", tags=["books"])
 
+IMPORT_FORMATS = {
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+IMPORT_SPOOL_BYTES = 1024 * 1024
+
 
 @router.post("/buku/create", response_model=schemas.BookResponse)
-def create_book(book: schemas.BookCreate, db: Session = Depends(database.get_db),
+async def create_book(book: schemas.BookCreate, db: database.DBSession = Depends(database.get_session),
                 current_user: schemas.User = Depends(get_current_user)
                 ):
     if current_user.role != "admin":
@@ -18,22 +28,123 @@ def create_book(book: schemas.BookCreate, db: Session = Depends(database.get_db)
             status_code=403,
             detail="You do not have permission to access this resource"
         )
-    return crud.create_book(db=db, book=book)
+    return await database.run_db(db, crud.create_book, book=book)
+
+
+@router.post("/buku/import", response_model=schemas.BookImportResult)
+async def import_books(request: Request, db: database.DBSession = Depends(database.get_session),
+                       current_user: schemas.User = Depends(get_current_user)
+                       ):
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=403,
+            detail="You do not have permission to access this resource"
+        )
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    file_format = IMPORT_FORMATS.get(content_type)
+    if file_format is None:
+        raise HTTPException(
+            status_code=415,
+            detail="Upload must be text/csv or application/x-ndjson"
+        )
+
+    # Body ditulis ke spool (pindah ke disk di atas 1 MB), lalu diproses per chunk
+    with tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_BYTES) as spool:
+        async for chunk in request.stream():
+            spool.write(chunk)
+        spool.seek(0)
+        return await database.run_db(db, crud.import_books, spool, file_format)
+
+
+@router.get("/buku/cache")
+async def book_cache_stats(current_user: schemas.User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=403,
+            detail="You do not have permission to access this resource"
+        )
+    return {"book": crud.book_cache.stats(), "search": crud.book_search_cache.stats()}
+
+
+# Multi-get: GET /books?ids=3,1,2, lewat cache yang sama dengan GET /books/{id}
+@router.get("", response_model=schemas.MultiGet[schemas.BookResponse])
+async def read_books_by_ids(
+        request: Request,
+        ids: str = Query(..., description="ID buku dipisah koma"),
+        fields: Optional[str] = Query(None, description="Kolom yang dikembalikan, dipisah koma"),
+        db: database.DBSession = Depends(database.get_session),
+):
+    book_ids = pagination.parse_ids(ids, schemas.MULTI_GET_MAX)
+    selected = pagination.parse_fields(fields, schemas.BOOK_FIELDS)
+    schema = schemas.projection(schemas.BookResponse, selected) if selected else schemas.BookResponse
+
+    versions = None
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        versions = await database.run_db(db, crud.get_book_versions_by_ids, ids=book_ids)
+        by_id = {row.id: row for row in versions}
+        ordered = [by_id[book_id] for book_id in book_ids if book_id in by_id]
+        missing = [book_id for book_id in book_ids if book_id not in by_id]
+        etag = conditional.etag_for(ordered, "ids", *(selected or ()), *missing)
+        if conditional.etag_matches(if_none_match, etag):
+            return conditional.not_modified(etag, conditional.last_modified(ordered))
+
+    books, missing = await database.run_db(db, crud.get_books_cached_by_ids, ids=book_ids, versions=versions)
+    headers = conditional.validator_headers(conditional.etag_for(books, "ids", *(selected or ()), *missing),
+                                            conditional.last_modified(books))
+    return typed_json(schemas.MultiGet[schema], {"items": books, "missing": missing}, headers)
 
 
-@router.get("/{book_info}", response_model=list[schemas.BookResponse])
-def read_books(
+# Autocomplete dari prefix index di memori, tanpa query database
+@router.get("/suggest", response_model=list[schemas.BookSuggestion])
+async def suggest_books(q: str = Query(..., min_length=1, max_length=100), limit: int = Query(8, ge=1, le=20)):
+    if not suggest.book_index.ready:
+        raise HTTPException(
+            status_code=503,
+            detail="Book suggestions are not available"
+        )
+    return suggest.book_index.suggest(q, limit)
+
+
+@router.get("/{book_info}",
+            response_model=Union[list[schemas.BookResponse], schemas.Page[schemas.BookResponse]])
+async def read_books(
+        request: Request,
         book_info: str = Path(..., description="ID buku atau keyword judul/pengarang"),
         skip: int = 0,
         limit: int = 10,
-        db: Session = Depends(database.get_db),
+        after: Optional[str] = None,
+        fields: Optional[str] = Query(None, description="Kolom yang dikembalikan, dipisah koma"),
+        db: database.DBSession = Depends(database.get_session),
 ):
+    selected = pagination.parse_fields(fields, schemas.BOOK_FIELDS)
+    schema = schemas.projection(schemas.BookResponse, selected) if selected else schemas.BookResponse
     try:
         parsed_info: Union[int, str] = int(book_info)
     except ValueError:
         parsed_info = book_info
 
-    books = crud.get_book(db=db, info=parsed_info, skip=skip, limit=limit)
+    after_id = pagination.decode_cursor(after)
+    # Bentuk response (list vs Page) ikut menentukan ETag
+    shape = (("page", limit) if after_id is not None else ("list",)) + (selected or ())
+
+    versions = None
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        versions = await database.run_db(db, crud.get_book_versions,
+                                         info=parsed_info, skip=skip, limit=limit, after=after_id)
+        etag = conditional.etag_for(versions, *shape)
+        if versions and conditional.etag_matches(if_none_match, etag):
+            return conditional.not_modified(etag, conditional.last_modified(versions))
+
+    books = await database.run_db(db, crud.get_book_cached,
+                                  info=parsed_info, skip=skip, limit=limit, after=after_id, versions=versions,
+                                  fields=selected)
+    headers = conditional.validator_headers(conditional.etag_for(books, *shape), conditional.last_modified(books))
+
+    if after_id is not None:
+        # Mode cursor (termasuk after= kosong): halaman kosong berarti data sudah habis, bukan 404
+        return typed_json(schemas.Page[schema], pagination.page(books, limit), headers)
 
     if not books:
         if isinstance(parsed_info, int):
@@ -46,14 +157,14 @@ def read_books(
                 status_code=404,
                 detail=f"Tidak ada buku yang ditemukan dengan keyword '{parsed_info}'."
             )
-    return books
+    return typed_json(list[schema], books, headers)
 
 
 @router.put("/{book_info}/update", response_model=schemas.BookResponse)
-def update_book(
+async def update_book(
         book_info: int,
         book_update: schemas.BookUpdate,
-        db: Session = Depends(database.get_db),
+        db: database.DBSession = Depends(database.get_session),
         current_user: schemas.User = Depends(get_current_user)
 ):
     if current_user.role != "admin":
@@ -61,15 +172,15 @@ def update_book(
             status_code=403,
             detail="You do not have permission to access this resource"
         )
-    updated_book = crud.update_book(db=db, book_id=book_info, book_update=book_update)
+    updated_book = await database.run_db(db, crud.update_book, book_id=book_info, book_update=book_update)
     if not updated_book:
         raise HTTPException(status_code=404, detail="Book not found")
     return updated_book
 
 @router.delete("/{book_info}/delete")
-def delete_book(
+async def delete_book(
         book_info: int,
-        db: Session = Depends(database.get_db),
+        db: database.DBSession = Depends(database.get_session),
         current_user: schemas.User = Depends(get_current_user)
 ):
     if current_user.role != "admin":
@@ -77,7 +188,7 @@ def delete_book(
             status_code=403,
             detail="You do not have permission to access this resource"
         )
-    book = crud.get_book(db=db, info=book_info)
+    book = await database.run_db(db, crud.get_book, info=book_info)
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
-    return crud.delete_book(db=db, book_id=book_info)
\ No newline at end of file
+    return await database.run_db(db, crud.delete_book, book_id=book_info)
\ No newline at end of file
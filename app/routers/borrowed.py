@@ -1,6 +1,10 @@
+from datetime import date
+from typing import Literal, Optional, Union
+
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app import schemas, database, crud
+from fastapi.responses import StreamingResponse
+from app import schemas, database, crud, pagination, reports
+from app.responses import typed_json
 from app.auth.dependencies import get_current_user
 
 router = APIRouter(
@@ -9,9 +13,9 @@ router = APIRouter(
 )
 
 @router.post("/create", response_model=schemas.BorrowedResponse)
-def create_borrowed(
+async def create_borrowed(
     borrowed: schemas.BorrowedCreate,
-    db: Session = Depends(database.get_db),
+    db: database.DBSession = Depends(database.get_session),
     current_user: schemas.User = Depends(get_current_user)
 ):
     if not current_user:
@@ -20,25 +24,73 @@ def create_borrowed(
             detail="Unauthorized: User must be logged in to borrow books"
         )
 
-    book = crud.get_book(db=db, info=borrowed.book_id)
-    if not book or book[0].stock <= 0:
+    created = await database.run_db(db, crud.create_borrowed, borrowed=borrowed)
+    if created is None:
         raise HTTPException(
             status_code=400,
             detail="Book is out of stock and cannot be borrowed"
         )
+    return created
+
+# Semua item gagal dikembalikan dengan 409 kalau atomic, selain itu 200 + status per item
+@router.post("/batch", response_model=schemas.BorrowedBatchResult)
+async def create_borrowed_batch(
+    batch: schemas.BorrowedBatchCreate,
+    db: database.DBSession = Depends(database.get_session),
+    current_user: schemas.User = Depends(get_current_user)
+):
+    if current_user.role != "admin" and current_user.id != batch.user_id:
+        raise HTTPException(
+            status_code=403,
+            detail="You do not have permission to borrow books for this user"
+        )
+    result = await database.run_db(db, crud.create_borrowed_batch, batch=batch)
+    return typed_json(schemas.BorrowedBatchResult, result, status_code=200 if result["committed"] else 409)
+
+@router.post("/batch/return", response_model=schemas.BorrowedBatchResult)
+async def return_borrowed_batch(
+    batch: schemas.BorrowedBatchReturn,
+    db: database.DBSession = Depends(database.get_session),
+    current_user: schemas.User = Depends(get_current_user)
+):
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=403,
+            detail="You do not have permission to return borrowed books"
+        )
+    result = await database.run_db(db, crud.return_borrowed_batch, batch=batch)
+    return typed_json(schemas.BorrowedBatchResult, result, status_code=200 if result["committed"] else 409)
 
-    book[0].stock -= 1
-    db.commit()
-    db.refresh(book[0])
+# Generator sync dengan session sendiri, sama seperti export (session request sudah ditutup saat streaming)
+def _stream_overdue(file_format: str, as_of: date, min_days: int):
+    with database.SessionLocal() as db:
+        yield from reports.OVERDUE_FORMATS[file_format](db, as_of, min_days)
 
-    return crud.create_borrowed(db=db, borrowed=borrowed)
+@router.get("/overdue")
+async def get_overdue(
+    as_of: Optional[date] = None,
+    min_days: int = 1,
+    format: Literal["ndjson", "csv"] = "ndjson",
+    current_user: schemas.User = Depends(get_current_user)
+):
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=403,
+            detail="You do not have permission to access this resource"
+        )
+    return StreamingResponse(
+        _stream_overdue(format, as_of or date.today(), min_days),
+        media_type="text/csv" if format == "csv" else "application/x-ndjson"
+    )
 
-@router.get("/user/{user_id}", response_model=list[schemas.BorrowedResponse])
-def get_borrowed_by_user(
+@router.get("/user/{user_id}",
+            response_model=Union[list[schemas.BorrowedResponse], schemas.Page[schemas.BorrowedResponse]])
+async def get_borrowed_by_user(
     user_id: int,
     skip: int = 0,
     limit: int = 10,
-    db: Session = Depends(database.get_db),
+    after: Optional[str] = None,
+    db: database.DBSession = Depends(database.get_session),
     current_user: schemas.User = Depends(get_current_user)
 ):
     if current_user.role != "admin" and current_user.id != user_id:
@@ -47,14 +99,22 @@ def get_borrowed_by_user(
             detail="You do not have permission to access this user's borrowed books"
         )
 
-    return crud.get_borrowed_records(db=db, user_id=user_id, skip=skip, limit=limit)
+    after_id = pagination.decode_cursor(after)
+    borrowed = await database.run_db(db, crud.get_borrowed_records,
+                                     user_id=user_id, skip=skip, limit=limit, after=after_id)
+    if after_id is None:
+        return typed_json(list[schemas.BorrowedResponse], borrowed)
+    return typed_json(schemas.Page[schemas.BorrowedResponse],
+                      pagination.page(borrowed, limit, key=lambda b: b["id"]))
 
-@router.get("/book/{book_id}", response_model=list[schemas.BorrowedResponse])
-def get_borrowed_by_book(
+@router.get("/book/{book_id}",
+            response_model=Union[list[schemas.BorrowedResponse], schemas.Page[schemas.BorrowedResponse]])
+async def get_borrowed_by_book(
     book_id: int,
     skip: int = 0,
     limit: int = 10,
-    db: Session = Depends(database.get_db),
+    after: Optional[str] = None,
+    db: database.DBSession = Depends(database.get_session),
     current_user: schemas.User = Depends(get_current_user)
 ):
     if current_user.role != "admin":
@@ -63,32 +123,29 @@ def get_borrowed_by_book(
             detail="You do not have permission to access borrowed records by book"
         )
 
-    borrowed = crud.get_borrowed_records(db=db, book_id=book_id, skip=skip, limit=limit)
+    after_id = pagination.decode_cursor(after)
+    borrowed = await database.run_db(db, crud.get_borrowed_records,
+                                     book_id=book_id, skip=skip, limit=limit, after=after_id)
+    # Mode cursor tidak pernah 404: halaman kosong berarti data sudah habis
+    if after_id is not None:
+        return typed_json(schemas.Page[schemas.BorrowedResponse],
+                          pagination.page(borrowed, limit, key=lambda b: b["id"]))
     if not borrowed:
         raise HTTPException(status_code=404, detail="No borrowed records found for this book")
-
-    return borrowed
+    return typed_json(list[schemas.BorrowedResponse], borrowed)
 
 
 @router.delete("/{borrowed_id}/return")
-def return_borrowed(
+async def return_borrowed(
     borrowed_id: int,
-    db: Session = Depends(database.get_db),
+    db: database.DBSession = Depends(database.get_session),
     current_user: schemas.User = Depends(get_current_user)
 ):
     if current_user.role == "admin":
-        borrowed = crud.get_borrowed(db=db, borrowed_id=borrowed_id)
-        if not borrowed:
+        returned = await database.run_db(db, crud.return_borrowed, borrowed_id=borrowed_id)
+        if not returned:
             raise HTTPException(status_code=404, detail="Borrowed record not found")
-
-        book = crud.get_book(db=db, info=borrowed["book_id"])
-        if not book:
-            raise HTTPException(status_code=404, detail="Book not found")
-        book[0].stock += 1
-        db.commit()
-        db.refresh(book[0])
-
-        return crud.delete_borrowed(db=db, borrowed_id=borrowed_id)
+        return returned
 
     else:
         raise HTTPException(
@@ -0,0 +1,83 @@
+import csv
+import enum
+import io
+import json
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+
+from app import schemas, database, crud
+from app.auth.dependencies import get_current_user
+
+router = APIRouter(
+    prefix="/export",
+    tags=["export"]
+)
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _plain(value):
+    if isinstance(value, enum.Enum):
+        return value.value
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+# Generator sync: StreamingResponse menjalankannya di threadpool, dan session-nya milik
+# generator sendiri karena session request sudah ditutup sebelum body selesai dikirim
+def _stream(table: str, file_format: str):
+    columns = crud.export_columns(table)
+    with database.SessionLocal() as db:
+        if file_format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+            yield buffer.getvalue()
+            for rows in crud.export_rows(db, table):
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerows([_plain(value) for value in row] for row in rows)
+                yield buffer.getvalue()
+        else:
+            for rows in crud.export_rows(db, table):
+                yield "".join(
+                    json.dumps({column: _plain(value) for column, value in zip(columns, row)}) + "\n"
+                    for row in rows
+                )
+
+
+def _export(table: str, file_format: str, current_user):
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=403,
+            detail="You do not have permission to access this resource"
+        )
+    return StreamingResponse(
+        _stream(table, file_format),
+        media_type=MEDIA_TYPES[file_format],
+        headers={"Content-Disposition": f'attachment; filename="{table}.{file_format}"'}
+    )
+
+
+@router.get("/books")
+async def export_books(format: Literal["ndjson", "csv"] = "ndjson",
+                       current_user: schemas.User = Depends(get_current_user)):
+    return _export("books", format, current_user)
+
+
+@router.get("/users")
+async def export_users(format: Literal["ndjson", "csv"] = "ndjson",
+                       current_user: schemas.User = Depends(get_current_user)):
+    return _export("users", format, current_user)
+
+
+@router.get("/borrowed")
+async def export_borrowed(format: Literal["ndjson", "csv"] = "ndjson",
+                          current_user: schemas.User = Depends(get_current_user)):
+    return _export("borrowed", format, current_user)
@@ -0,0 +1,65 @@
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from app import schemas, database, crud
+from app.auth.dependencies import get_current_user
+
+router = APIRouter(
+    prefix="/stats",
+    tags=["stats"]
+)
+
+
+def _require_admin(current_user):
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=403,
+            detail="You do not have permission to access this resource"
+        )
+
+
+@router.get("/books/top", response_model=list[schemas.BookStatsResponse])
+async def top_books(by: Literal["borrows", "active"] = "borrows",
+                    limit: int = Query(10, ge=1, le=100),
+                    db: database.DBSession = Depends(database.get_session)):
+    return await database.run_db(db, crud.top_books, by=by, limit=limit)
+
+
+@router.get("/books/{book_id}", response_model=schemas.BookStatsResponse)
+async def book_stats(book_id: int, db: database.DBSession = Depends(database.get_session)):
+    stats = await database.run_db(db, crud.get_book_stats, book_id)
+    if stats is None:
+        raise HTTPException(status_code=404, detail="Book not found")
+    return stats
+
+
+@router.get("/users/top", response_model=list[schemas.UserStatsResponse])
+async def top_users(by: Literal["borrows", "active"] = "active",
+                    limit: int = Query(10, ge=1, le=100),
+                    db: database.DBSession = Depends(database.get_session),
+                    current_user: schemas.User = Depends(get_current_user)):
+    _require_admin(current_user)
+    return await database.run_db(db, crud.top_users, by=by, limit=limit)
+
+
+@router.get("/users/{user_id}", response_model=schemas.UserStatsResponse)
+async def user_stats(user_id: int,
+                     db: database.DBSession = Depends(database.get_session),
+                     current_user: schemas.User = Depends(get_current_user)):
+    if current_user.role != "admin" and current_user.id != user_id:
+        raise HTTPException(
+            status_code=403,
+            detail="You do not have permission to access this user's stats"
+        )
+    stats = await database.run_db(db, crud.get_user_stats, user_id)
+    if stats is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return stats
+
+
+@router.post("/rebuild")
+async def rebuild_stats(db: database.DBSession = Depends(database.get_session),
+                        current_user: schemas.User = Depends(get_current_user)):
+    _require_admin(current_user)
+    return await database.run_db(db, crud.rebuild_circulation_stats)
@@ -1,8 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from typing import Optional, Union
 
-from app import schemas, crud, database, models
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+
+from app import schemas, crud, database, models, pagination, conditional
+from app.responses import typed_json
 from app.auth.dependencies import get_current_user
+from app.auth.utils import hash_password_async, verify_password_async
 
 router = APIRouter(
     prefix="/users",
@@ -11,15 +14,19 @@ router = APIRouter(
 
 
 @router.post("/register", response_model=schemas.UserResponse)
-def create_user(user: schemas.UserCreate, db: Session = Depends(database.get_db)):
-    return crud.create_user(db=db, user=user)
+async def create_user(user: schemas.UserCreate, db: database.DBSession = Depends(database.get_session)):
+    hashed_password = await hash_password_async(user.password)
+    return await database.run_db(db, crud.create_user, user=user, hashed_password=hashed_password)
 
 
-@router.get("/user_data", response_model=list[schemas.UserResponse])
-def read_users(
+@router.get("/user_data",
+            response_model=Union[list[schemas.UserResponse], schemas.Page[schemas.UserResponse]])
+async def read_users(
         skip: int = 0,
         limit: int = 10,
-        db: Session = Depends(database.get_db),
+        after: Optional[str] = None,
+        fields: Optional[str] = Query(None, description="Kolom yang dikembalikan, dipisah koma"),
+        db: database.DBSession = Depends(database.get_session),
         current_user: models.User = Depends(get_current_user)
 ):
     if current_user.role != "admin":
@@ -27,13 +34,47 @@ def read_users(
             status_code=403,
             detail="You do not have permission to access this resource"
         )
-    return crud.get_users(db=db, skip=skip, limit=limit)
+    after_id = pagination.decode_cursor(after)
+    selected = pagination.parse_fields(fields, schemas.USER_FIELDS)
+    schema = schemas.projection(schemas.UserRecord, selected) if selected else schemas.UserRecord
+    users = await database.run_db(db, crud.get_users, skip=skip, limit=limit, after=after_id, fields=selected)
+    if after_id is None:
+        return typed_json(list[schema], users)
+    return typed_json(schemas.Page[schema], pagination.page(users, limit))
+
+
+# Multi-get admin: GET /users?ids=3,1,2
+@router.get("", response_model=schemas.MultiGet[schemas.UserResponse])
+async def read_users_by_ids(
+        request: Request,
+        ids: str = Query(..., description="ID user dipisah koma"),
+        fields: Optional[str] = Query(None, description="Kolom yang dikembalikan, dipisah koma"),
+        db: database.DBSession = Depends(database.get_session),
+        current_user: models.User = Depends(get_current_user)
+):
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=403,
+            detail="You do not have permission to access this resource"
+        )
+    user_ids = pagination.parse_ids(ids, schemas.MULTI_GET_MAX)
+    selected = pagination.parse_fields(fields, schemas.USER_FIELDS)
+    schema = schemas.projection(schemas.UserRecord, selected) if selected else schemas.UserRecord
+    users, missing = await database.run_db(db, crud.get_users_by_ids, ids=user_ids, fields=selected)
+    etag = conditional.etag_for(users, "ids", *(selected or ()), *missing)
+    modified = conditional.last_modified(users)
+    if conditional.etag_matches(request.headers.get("if-none-match"), etag):
+        return conditional.not_modified(etag, modified)
+    return typed_json(schemas.MultiGet[schema], {"items": users, "missing": missing},
+                      conditional.validator_headers(etag, modified))
 
 
 @router.get("/{user_id}", response_model=schemas.UserResponse)
-def read_user(
+async def read_user(
         user_id: int,
-        db: Session = Depends(database.get_db),
+        request: Request,
+        response: Response,
+        db: database.DBSession = Depends(database.get_session),
         current_user: models.User = Depends(get_current_user)
 ):
     if current_user.role != "admin" and current_user.id != user_id:
@@ -42,17 +83,29 @@ def read_user(
             detail="You do not have permission to access this user"
         )
 
-    user = crud.get_user(db=db, user_id=user_id)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        version = await database.run_db(db, crud.get_user_version, user_id=user_id)
+        if version is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        etag = conditional.etag_for([version])
+        if conditional.etag_matches(if_none_match, etag):
+            return conditional.not_modified(etag, conditional.last_modified([version]))
+
+    user = await database.run_db(db, crud.get_user, user_id=user_id)
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
-    return crud.get_user(db=db, user_id=user_id)
+    response.headers.update(conditional.validator_headers(
+        conditional.etag_for([user]), conditional.last_modified([user])
+    ))
+    return user
 
 
 @router.put("/{user_id}/update", response_model=schemas.UserResponse)
-def update_user(
+async def update_user(
         user_id: int,
         user_update: schemas.UserUpdate,
-        db: Session = Depends(database.get_db),
+        db: database.DBSession = Depends(database.get_session),
         current_user: models.User = Depends(get_current_user)
 ):
     if current_user.role != "admin" and current_user.id != user_id:
@@ -60,17 +113,17 @@ def update_user(
             status_code=403,
             detail="You do not have permission to access this user"
         )
-    user = crud.get_user(db=db, user_id=user_id)
+    user = await database.run_db(db, crud.get_user, user_id=user_id)
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
-    return crud.update_user(db=db, user_id=user_id, user_update=user_update)
+    return await database.run_db(db, crud.update_user, user_id=user_id, user_update=user_update)
 
 
 @router.put("/{user_id}/change_password")
-def update_user_password(
+async def update_user_password(
         user_id: int,
         password_update: schemas.PasswordUpdate,
-        db: Session = Depends(database.get_db),
+        db: database.DBSession = Depends(database.get_session),
         current_user: models.User = Depends(get_current_user)
 ):
     if current_user.id != user_id:
@@ -78,16 +131,22 @@ def update_user_password(
             status_code=403,
             detail="You do not have permission to access this user"
         )
-    user = crud.get_user(db=db, user_id=user_id)
+    user = await database.run_db(db, crud.get_user, user_id=user_id)
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
-    return crud.update_user_password(db=db, user_id=user_id, password_update=password_update)
+    if not await verify_password_async(password_update.password, user.password):
+        raise HTTPException(
+            status_code=400,
+            detail="Incorrect current password"
+        )
+    hashed_password = await hash_password_async(password_update.new_password)
+    return await database.run_db(db, crud.set_user_password, user_id=user_id, hashed_password=hashed_password)
 
 
 @router.delete("/{user_id}/delete")
-def delete_user(
+async def delete_user(
         user_id: int,
-        db: Session = Depends(database.get_db),
+        db: database.DBSession = Depends(database.get_session),
         current_user: models.User = Depends(get_current_user)
 ):
     if current_user.role != "admin":
@@ -102,8 +161,8 @@ def delete_user(
             detail="You cannot delete your own account"
         )
 
-    user = crud.get_user(db=db, user_id=user_id)
+    user = await database.run_db(db, crud.get_user, user_id=user_id)
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
 
-    return crud.delete_user(db=db, user_id=user_id)
+    return await database.run_db(db, crud.delete_user, user_id=user_id)
@@ -1,6 +1,12 @@
-from typing import Optional
-from datetime import date
-from pydantic import BaseModel, EmailStr
+from functools import lru_cache
+from typing import Generic, Optional, TypeVar
+from datetime import date, datetime
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, create_model
+
+T = TypeVar("T")
+
+BORROW_BATCH_MAX = 100
+MULTI_GET_MAX = 200
 
 
 # User schema
@@ -50,6 +56,10 @@ class UserResponse(BaseModel):
     class Config:
         from_attributes = True
 
+# Untuk membaca baris dari DB: email sudah divalidasi saat disimpan, tidak perlu dicek ulang
+class UserRecord(UserResponse):
+    email: str
+
 
 # Book schema
 class BookBase(BaseModel):
@@ -73,6 +83,11 @@ class BookResponse(BaseModel):
     class Config:
         from_attributes = True
 
+# BookResponse + versi baris; field tambahan dibuang oleh response_model
+class BookRecord(BookResponse):
+    version: int = 1
+    updated_at: Optional[datetime] = None
+
 class BookUpdate(BaseModel):
     name: Optional[str] = None
     author: Optional[str] = None
@@ -81,6 +96,24 @@ class BookUpdate(BaseModel):
     stock: Optional[int] = None
 
 
+class BookSuggestion(BaseModel):
+    text: str
+    type: str
+    books: int
+    book_id: Optional[int] = None
+
+
+class BookImportError(BaseModel):
+    row: Optional[int] = None
+    isbn: Optional[str] = None
+    error: str
+
+class BookImportResult(BaseModel):
+    inserted: int
+    failed: int
+    errors: list[BookImportError]
+
+
 # Borrowed schema
 class BorrowedBase(BaseModel):
     user_id: int
@@ -104,6 +137,77 @@ class BorrowedResponse(BaseModel):
         from_attributes = True
 
 
+# atomic=True: semua item berhasil atau tidak ada yang disimpan; False: item yang valid tetap disimpan
+class BorrowedBatchCreate(BaseModel):
+    user_id: int
+    book_ids: list[int] = Field(min_length=1, max_length=BORROW_BATCH_MAX)
+    date_borrowed: date
+    date_due: date
+    atomic: bool = True
+
+
+class BorrowedBatchReturn(BaseModel):
+    borrowed_ids: list[int] = Field(min_length=1, max_length=BORROW_BATCH_MAX)
+    atomic: bool = True
+
+
+# id = book_id (pinjam) atau borrowed_id (kembali) sesuai urutan request
+class BorrowedBatchItem(BaseModel):
+    id: int
+    status: str
+    borrowed: Optional[BorrowedResponse] = None
+
+
+class BorrowedBatchResult(BaseModel):
+    committed: bool
+    items: list[BorrowedBatchItem]
+
+
+# Statistik sirkulasi
+class BookStatsResponse(BaseModel):
+    book_id: int
+    name: str
+    total_borrows: int
+    active_loans: int
+    stock: int
+    copies: int
+    utilisation: float
+
+
+class UserStatsResponse(BaseModel):
+    user_id: int
+    name: str
+    total_borrows: int
+    active_loans: int
+
+
+# Pagination schema
+class Page(BaseModel, Generic[T]):
+    items: list[T]
+    next_cursor: Optional[str] = None
+
+
+# Hasil multi-get: items sesuai urutan ids yang diminta, id yang tidak ada di missing
+class MultiGet(BaseModel, Generic[T]):
+    items: list[T]
+    missing: list[int]
+
+
+# Allow-list ?fields= per schema
+BOOK_FIELDS = tuple(BookResponse.model_fields)
+USER_FIELDS = tuple(UserRecord.model_fields)
+
+
+# Model turunan yang hanya berisi field terpilih, di-cache per kombinasi field
+@lru_cache(maxsize=256)
+def projection(schema: type[BaseModel], fields: tuple) -> type[BaseModel]:
+    return create_model(
+        f"{schema.__name__}Fields",
+        __config__=ConfigDict(from_attributes=True),
+        **{name: (schema.model_fields[name].annotation, ...) for name in fields}
+    )
+
+
 # login schema
 class LoginRequest(BaseModel):
     email: str
@@ -0,0 +1,99 @@
+import re
+
+from sqlalchemy import Column, Integer, MetaData, String, Table, literal_column, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+
+FTS_TABLE = "book_fts"
+FTS_ENABLED = False
+
+# Metadata terpisah supaya create_all() tidak mencoba membuat virtual table ini
+book_fts = Table(
+    FTS_TABLE,
+    MetaData(),
+    Column("rowid", Integer, primary_key=True),
+    Column("name", String),
+    Column("author", String),
+    Column("rank"),
+)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, author,
+        content='book', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS book_fts_ai AFTER INSERT ON book BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, author) VALUES (new.id, new.name, new.author);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS book_fts_ad AFTER DELETE ON book BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, author) VALUES ('delete', old.id, old.name, old.author);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS book_fts_au AFTER UPDATE OF name, author ON book BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, author) VALUES ('delete', old.id, old.name, old.author);
+        INSERT INTO {FTS_TABLE}(rowid, name, author) VALUES (new.id, new.name, new.author);
+    END
+    """,
+]
+
+
+# Index FTS5 untuk judul/pengarang buku (hanya SQLite), disinkronkan lewat trigger
+def init_book_search(engine: Engine):
+    global FTS_ENABLED
+    if engine.dialect.name != "sqlite":
+        FTS_ENABLED = False
+        return False
+
+    try:
+        with engine.begin() as conn:
+            exists = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type='table' AND name=:name"),
+                {"name": FTS_TABLE}
+            ).first()
+            for statement in _DDL:
+                conn.execute(text(statement))
+            if not exists:
+                # Isi index dari data buku yang sudah ada
+                conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    except OperationalError:
+        # SQLite tanpa modul FTS5, pakai pencarian ILIKE
+        FTS_ENABLED = False
+        return False
+
+    FTS_ENABLED = True
+    return True
+
+
+# Tanpa DDL: aktifkan FTS kalau index sudah dibuat sebelumnya (python -m app.migrate)
+def detect_book_search(engine: Engine):
+    global FTS_ENABLED
+    if engine.dialect.name != "sqlite":
+        FTS_ENABLED = False
+        return False
+    with engine.connect() as conn:
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type='table' AND name=:name"),
+            {"name": FTS_TABLE}
+        ).first()
+    FTS_ENABLED = exists is not None
+    return FTS_ENABLED
+
+
+# Keyword bebas -> query MATCH FTS5, tiap token dicocokkan sebagai prefix
+def build_match_query(keyword: str) -> str:
+    tokens = _TOKEN_RE.findall(keyword)
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def match(query: str):
+    return literal_column(FTS_TABLE).op("MATCH")(query)
@@ -0,0 +1,285 @@
+import heapq
+import os
+import re
+import threading
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app import models
+
+SUGGEST_ENABLED = os.getenv("SUGGEST_ENABLED", "true").lower() in ("1", "true", "yes")
+# Index per proses; perubahan dari instance lain diambil refresh inkremental ini (0 = tidak pernah)
+SUGGEST_REFRESH_SECONDS = float(os.getenv("SUGGEST_REFRESH_SECONDS", "300"))
+# Judul panjang cukup diindex dari beberapa kata pertama
+SUGGEST_MAX_WORDS = 8
+# Refresh membaca ulang baris yang diubah sejak sedikit sebelum refresh terakhir (selisih jam antar
+# instance, transaksi yang belum commit saat refresh); perubahan yang sama aman diterapkan dua kali
+_REFRESH_OVERLAP = timedelta(minutes=1)
+# Mulai dari jumlah perubahan ini posting digabung sekali jalan, bukan insert/delete per kata
+_BATCH_MIN = 32
+_MAX_SCAN = 5000
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_KINDS = ("title", "author")
+
+
+def normalize(text: str) -> str:
+    text = text or ""
+    if not text.isascii():
+        # Buang diakritik supaya "cafe" cocok dengan "Café"
+        text = unicodedata.normalize("NFKD", text)
+        text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(_WORD_RE.findall(text.casefold()))
+
+
+# Prefix index: satu posting (kata, entry id) per kata berbeda, disimpan sebagai list kata terurut
+# (string kata di-intern, jadi satu posting = satu pointer) + array entry id paralel, dicari dengan bisect.
+# Satu entry per judul/pengarang unik setelah normalisasi, disimpan di list paralel per entry id
+# (tanpa objek per entry); teks lengkapnya hanya disimpan sekali.
+class PrefixIndex:
+    def __init__(self):
+        self._words = []
+        self._postings = array("I")
+        self._vocab = {}
+        self._kinds = bytearray()
+        self._texts = []
+        self._norms = []
+        # int untuk entry dengan satu buku (kasus umum), list kalau dipakai beberapa buku, None = dihapus
+        self._books = []
+        self._ids = ({}, {})
+        # book id -> entry id judul/pengarang (-1 = tidak ada), supaya update/delete tidak butuh nilai lama
+        self._titles = array("i")
+        self._authors = array("i")
+        self._count = 0
+        # (posting baru, entry id yang dihapus) selama _apply_all dengan banyak perubahan
+        self._batch = None
+        self._lock = threading.Lock()
+        # Perubahan selama build() dicatat di sini lalu diulang di index baru setelah ditukar
+        self._pending = None
+        self.watermark = None
+        self.built_at = None
+
+    @property
+    def ready(self) -> bool:
+        return self.built_at is not None
+
+    def __len__(self):
+        return self._count
+
+    def _link(self, kind: int, text: str, book_id: int) -> int:
+        norm = normalize(text)
+        if not norm:
+            return -1
+        entry_id = self._ids[kind].get(norm)
+        if entry_id is not None:
+            books = self._books[entry_id]
+            if isinstance(books, list):
+                books.append(book_id)
+            else:
+                self._books[entry_id] = [books, book_id]
+            return entry_id
+
+        entry_id = self._ids[kind][norm] = len(self._texts)
+        self._kinds.append(kind)
+        self._texts.append(text)
+        self._norms.append(norm)
+        self._books.append(book_id)
+        self._count += 1
+        for word in dict.fromkeys(norm.split(" ")[:SUGGEST_MAX_WORDS]):
+            word = self._vocab.setdefault(word, word)
+            if self._batch is not None:
+                self._batch[0].append((word, entry_id))
+            else:
+                # entry id selalu naik, jadi posting baru ada di ujung blok kata tersebut
+                i = bisect_right(self._words, word)
+                self._words.insert(i, word)
+                self._postings.insert(i, entry_id)
+        return entry_id
+
+    def _unlink(self, entry_id: int, book_id: int):
+        if entry_id < 0 or self._books[entry_id] is None:
+            return
+        books = self._books[entry_id]
+        if isinstance(books, list):
+            if book_id in books:
+                books.remove(book_id)
+            if len(books) == 1:
+                self._books[entry_id] = books[0]
+            return
+        if books != book_id:
+            return
+        norm = self._norms[entry_id]
+        self._books[entry_id] = self._texts[entry_id] = self._norms[entry_id] = None
+        self._count -= 1
+        del self._ids[self._kinds[entry_id]][norm]
+        if self._batch is not None:
+            self._batch[1].add(entry_id)
+            return
+        for word in dict.fromkeys(norm.split(" ")[:SUGGEST_MAX_WORDS]):
+            lo = bisect_left(self._words, word)
+            hi = bisect_right(self._words, word, lo)
+            i = bisect_left(self._postings, entry_id, lo, hi)
+            if i < hi and self._postings[i] == entry_id:
+                del self._words[i]
+                del self._postings[i]
+
+    def _same(self, entry_id: int, text: str) -> bool:
+        return (self._norms[entry_id] if entry_id >= 0 else "") == normalize(text)
+
+    # Idempoten: mengulang put/remove yang sudah berlaku tidak mengubah apa pun
+    def _put(self, book_id: int, name: str, author: str):
+        missing = book_id + 1 - len(self._titles)
+        if missing > 0:
+            self._titles.extend([-1] * missing)
+            self._authors.extend([-1] * missing)
+        title_id, author_id = self._titles[book_id], self._authors[book_id]
+        if title_id >= 0 or author_id >= 0:
+            if self._same(title_id, name) and self._same(author_id, author):
+                return
+            self._remove(book_id)
+        self._titles[book_id] = self._link(0, name, book_id)
+        self._authors[book_id] = self._link(1, author, book_id)
+
+    def _remove(self, book_id: int):
+        if book_id >= len(self._titles):
+            return
+        self._unlink(self._titles[book_id], book_id)
+        self._unlink(self._authors[book_id], book_id)
+        self._titles[book_id] = self._authors[book_id] = -1
+
+    def _run(self, change):
+        if change[0] == "put":
+            self._put(*change[1:])
+        else:
+            self._remove(change[1])
+
+    # Dipanggil dengan lock dipegang. Banyak perubahan -> posting lama yang masih hidup dan posting baru
+    # (sudah diurutkan) digabung sekali jalan, bukan satu insert/delete list per kata
+    def _apply_all(self, changes: list):
+        if len(changes) < _BATCH_MIN:
+            for change in changes:
+                self._run(change)
+            return
+        self._batch = ([], set())
+        try:
+            for change in changes:
+                self._run(change)
+        finally:
+            added, dropped = self._batch
+            self._batch = None
+            added = sorted(posting for posting in added if posting[1] not in dropped)
+            kept = ((word, entry_id) for word, entry_id in zip(self._words, self._postings)
+                    if entry_id not in dropped)
+            words, postings = [], array("I")
+            for word, entry_id in heapq.merge(kept, added):
+                words.append(word)
+                postings.append(entry_id)
+            self._words, self._postings = words, postings
+
+    def _apply(self, changes: list):
+        with self._lock:
+            if self._pending is not None:
+                self._pending.extend(changes)
+            if self.ready:
+                self._apply_all(changes)
+
+    def put(self, book_id: int, name: str, author: str):
+        self._apply([("put", book_id, name, author)])
+
+    def remove(self, book_id: int):
+        self._apply([("remove", book_id)])
+
+    def put_many(self, rows):
+        self._apply([("put", book_id, name, author) for book_id, name, author in rows])
+
+    def book_ids(self) -> list:
+        with self._lock:
+            return [book_id for book_id, entry_id in enumerate(self._titles) if entry_id >= 0]
+
+    # Dibangun di objek baru lalu ditukar, jadi pencarian tetap jalan selama build
+    def build(self, db: Session):
+        started = datetime.now(timezone.utc)
+        with self._lock:
+            self._pending = []
+        try:
+            fresh = PrefixIndex()
+            fresh._apply_all([
+                ("put", book_id, name, author)
+                for book_id, name, author in db.execute(select(models.Book.id, models.Book.name, models.Book.author))
+            ])
+        except BaseException:
+            with self._lock:
+                self._pending = None
+            raise
+        with self._lock:
+            fresh._apply_all(self._pending)
+            for name in ("_words", "_postings", "_vocab", "_kinds", "_texts", "_norms", "_books", "_ids",
+                         "_titles", "_authors", "_count"):
+                setattr(self, name, getattr(fresh, name))
+            self._pending = None
+            self.watermark = started
+            self.built_at = time.monotonic()
+
+    # Refresh inkremental: baris yang diubah sejak refresh terakhir (updated_at), lalu buang buku yang
+    # sudah dihapus (scan id saja). Hanya id yang sudah ada di index sebelum scan yang boleh dibuang,
+    # jadi buku baru dari hook lokal tidak ikut terhapus.
+    def refresh(self, db: Session):
+        if not self.ready:
+            return self.build(db)
+        started = datetime.now(timezone.utc)
+        changes = [
+            ("put", book_id, name, author)
+            for book_id, name, author in db.execute(
+                select(models.Book.id, models.Book.name, models.Book.author)
+                .where(models.Book.updated_at >= self.watermark - _REFRESH_OVERLAP)
+            )
+        ]
+        known = self.book_ids()
+        present = set(db.scalars(select(models.Book.id)))
+        changes += [("remove", book_id) for book_id in known if book_id not in present]
+        with self._lock:
+            self._apply_all(changes)
+            self.watermark = started
+            self.built_at = time.monotonic()
+
+    # Kata terpanjang di query dipakai untuk mencari posting, lalu frasa lengkapnya dicek di awal kata.
+    # Urutan hasil: cocok di awal teks dulu, kemudian yang dipakai paling banyak buku, lalu yang paling pendek
+    def suggest(self, query: str, limit: int = 8) -> list:
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        probe = max(prefix.split(" "), key=len)
+        phrase = " " + prefix
+        wanted = max(limit * 20, 100)
+        candidates = set()
+        with self._lock:
+            words, postings, norms = self._words, self._postings, self._norms
+            i = bisect_left(words, probe)
+            end = min(len(words), i + _MAX_SCAN)
+            while i < end and len(candidates) < wanted and words[i].startswith(probe):
+                if phrase in " " + norms[postings[i]]:
+                    candidates.add(postings[i])
+                i += 1
+            results = sorted(candidates, key=lambda entry_id: (
+                not norms[entry_id].startswith(prefix), -self._book_count(entry_id),
+                len(norms[entry_id]), norms[entry_id]
+            ))
+            return [
+                {"text": self._texts[entry_id], "type": _KINDS[self._kinds[entry_id]],
+                 "books": self._book_count(entry_id),
+                 "book_id": None if isinstance(self._books[entry_id], list) else self._books[entry_id]}
+                for entry_id in results[:limit]
+            ]
+
+    def _book_count(self, entry_id: int) -> int:
+        books = self._books[entry_id]
+        return len(books) if isinstance(books, list) else 1
+
+
+book_index = PrefixIndex()
@@ -0,0 +1,61 @@
+# Benchmark overhead autentikasi per request, dengan dan tanpa revocation filter.
+#
+#   python -m benchmarks.auth_overhead --revoked 100000 --requests 5000
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Auth overhead with/without the revocation filter")
+    parser.add_argument("--revoked", type=int, default=100_000)
+    parser.add_argument("--requests", type=int, default=5_000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_auth_")
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+
+    from sqlalchemy import insert
+
+    from app import models
+    from app.auth import dependencies
+    from app.auth.utils import create_access_token, revocation_filter, token_digest
+    from app.database import Base, SessionLocal, engine
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        db.add(models.User(name="Bench", username="bench", email="bench@example.com", password="x",
+                           address="-", phone="-", role=models.RoleEnum.user))
+        now = datetime.now(timezone.utc)
+        db.execute(insert(models.BlacklistedToken), [
+            {"user_id": 1, "token_hash": token_digest(f"revoked-token-{i:08d}"),
+             "expires_at": now + timedelta(hours=1), "blacklisted_at": now}
+            for i in range(args.revoked)
+        ])
+        db.commit()
+
+        token = create_access_token(data={"sub": "bench@example.com", "role": "customer"})
+        revocation_filter.load(db)
+
+        print(f"{args.revoked} revoked tokens, {args.requests} requests")
+        for label, enabled in (("table lookup", False), ("revocation filter", True)):
+            revocation_filter.enabled = enabled
+            start = time.perf_counter()
+            for _ in range(args.requests):
+                # _authenticate langsung (get_current_user async dan mendahulukan principal cache),
+                # supaya yang terukur adalah jalur auth penuh
+                dependencies._authenticate(db, token)
+            elapsed = time.perf_counter() - start
+            print(f"{label:<20}{elapsed / args.requests * 1e6:>10.1f} us/request")
+    finally:
+        db.close()
+        engine.dispose()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# Benchmark pencarian buku: ILIKE '%kw%' vs index FTS5.
+#
+#   python -m benchmarks.book_search --books 1000000
+import argparse
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+
+WORDS = [
+    "laskar", "pelangi", "bumi", "manusia", "ronggeng", "dukuh", "paruk", "negeri", "menara",
+    "cantik", "luka", "hujan", "senja", "ayat", "cinta", "pulang", "perahu", "kertas", "ksatria",
+    "galaksi", "python", "fastapi", "database", "sejarah", "nusantara", "filsafat", "ekonomi",
+]
+AUTHORS = [
+    "Andrea Hirata", "Pramoedya Ananta Toer", "Ahmad Tohari", "Ahmad Fuadi", "Eka Kurniawan",
+    "Tere Liye", "Leila Chudori", "Dee Lestari", "Habiburrahman", "Seno Gumira",
+]
+KEYWORDS = ["pelangi", "toer", "hirata", "cinta senja", "galak", "zzzz"]
+
+
+# Lewat engine aplikasi: engine kedua tidak bisa mengganti journal_mode selama engine aplikasi (WAL)
+# masih memegang database
+def seed(engine, total: int, batch: int = 50_000):
+    from sqlalchemy import text
+
+    rng = random.Random(42)
+    with engine.begin() as conn:
+        for start in range(0, total, batch):
+            rows = [
+                {
+                    "name": " ".join(rng.sample(WORDS, 3)).title(),
+                    "author": rng.choice(AUTHORS),
+                    "isbn": f"978-{i:010d}",
+                    "stock": rng.randint(0, 10),
+                }
+                for i in range(start, min(start + batch, total))
+            ]
+            conn.execute(
+                text("INSERT INTO book (name, author, isbn, date, stock) "
+                     "VALUES (:name, :author, :isbn, '2020-01-01', :stock)"),
+                rows
+            )
+
+
+def run(db, keyword: str, repeat: int):
+    from app import crud
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        crud.get_book(db=db, info=keyword, skip=0, limit=10)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ILIKE vs FTS5 book search benchmark")
+    parser.add_argument("--books", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_search_")
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+
+    from app import models, search  # noqa: F401
+    from app.database import Base, SessionLocal, engine
+
+    Base.metadata.create_all(bind=engine)
+    search.init_book_search(engine)
+
+    start = time.perf_counter()
+    seed(engine, args.books)
+    print(f"seeded {args.books} books in {time.perf_counter() - start:.1f}s ({workdir})")
+
+    db = SessionLocal()
+    try:
+        print(f"{'keyword':<14}{'ilike ms':>12}{'fts ms':>12}")
+        for keyword in KEYWORDS:
+            search.FTS_ENABLED = False
+            ilike = run(db, keyword, args.repeat)
+            search.FTS_ENABLED = True
+            fts = run(db, keyword, args.repeat)
+            print(f"{keyword:<14}{ilike:>12.2f}{fts:>12.2f}")
+    finally:
+        db.close()
+        engine.dispose()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# Stress test peminjaman paralel: jalur lama (baca stok, cek di Python, dua commit)
+# vs crud.create_borrowed (UPDATE ... WHERE stock > 0 + INSERT dalam satu transaksi).
+#
+#   python -m benchmarks.borrow_stress --stock 50 --attempts 400 --threads 16
+import argparse
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import date
+
+
+def legacy_borrow(db, borrowed):
+    from app import crud, models
+
+    book = crud.get_book(db=db, info=borrowed.book_id)
+    if not book or book[0].stock <= 0:
+        return None
+    book[0].stock -= 1
+    db.commit()
+    db.refresh(book[0])
+    db_borrowed = models.Borrowed(**borrowed.model_dump())
+    db.add(db_borrowed)
+    db.commit()
+    return db_borrowed
+
+
+def run(label, borrow, stock: int, attempts: int, threads: int):
+    from sqlalchemy.exc import OperationalError
+
+    from app import models, schemas
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    book = models.Book(name=f"Stress {label}", author="-", isbn=f"stress-{label}",
+                       date=date(2020, 1, 1), stock=stock)
+    db.add(book)
+    db.commit()
+    book_id = book.id
+    db.close()
+
+    borrowed = schemas.BorrowedCreate(user_id=1, book_id=book_id, date_borrowed=date(2024, 1, 1),
+                                      date_due=date(2024, 1, 15))
+    counts = {"ok": 0, "rejected": 0, "errors": 0}
+    lock = threading.Lock()
+    remaining = iter(range(attempts))
+
+    def worker():
+        while True:
+            with lock:
+                if next(remaining, None) is None:
+                    return
+            session = SessionLocal()
+            try:
+                result = borrow(session, borrowed)
+                key = "ok" if result is not None else "rejected"
+            except OperationalError:
+                session.rollback()
+                key = "errors"
+            finally:
+                session.close()
+            with lock:
+                counts[key] += 1
+
+    start = time.perf_counter()
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    db = SessionLocal()
+    final_stock = db.get(models.Book, book_id).stock
+    records = db.query(models.Borrowed).filter(models.Borrowed.book_id == book_id).count()
+    db.close()
+    print(f"{label:<10}{attempts / elapsed:>10.1f}{counts['ok']:>8}{counts['rejected']:>10}"
+          f"{counts['errors']:>8}{records:>9}{final_stock:>7}{max(records - stock, 0):>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent borrow stress test")
+    parser.add_argument("--stock", type=int, default=50)
+    parser.add_argument("--attempts", type=int, default=400)
+    parser.add_argument("--threads", type=int, default=16)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_borrow_")
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+    try:
+        from app import crud, models  # noqa: F401
+        from app.database import Base, engine
+
+        Base.metadata.create_all(bind=engine)
+        print(f"stock {args.stock}, {args.attempts} attempts, {args.threads} threads")
+        print(f"{'path':<10}{'att/s':>10}{'ok':>8}{'rejected':>10}{'errors':>8}{'records':>9}"
+              f"{'stock':>7}{'oversold':>10}")
+        run("legacy", legacy_borrow, args.stock, args.attempts, args.threads)
+        run("atomic", crud.create_borrowed, args.stock, args.attempts, args.threads)
+        engine.dispose()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
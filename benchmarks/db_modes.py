@@ -0,0 +1,125 @@
+# Load benchmark: stack database sync (threadpool) vs async (AsyncSession/aiosqlite).
+#
+#   python -m benchmarks.db_modes --requests 2000 --concurrency 50
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def seed(books: int):
+    from datetime import date
+
+    from sqlalchemy import insert
+
+    from app import models
+    from app.auth.utils import create_access_token, hash_password
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        db.add(models.User(name="Admin", username="admin", email="admin@example.com",
+                           password=hash_password("admin"), address="-", phone="-",
+                           role=models.RoleEnum.admin))
+        db.execute(insert(models.Book), [
+            {"name": f"Buku {i}", "author": f"Pengarang {i % 100}", "isbn": f"isbn-{i}",
+             "date": date(2020, 1, 1), "stock": 5}
+            for i in range(books)
+        ])
+        db.commit()
+    finally:
+        db.close()
+    return create_access_token(data={"sub": "admin@example.com", "role": "admin"})
+
+
+async def drive(app, token: str, books: int, total: int, concurrency: int):
+    import httpx
+
+    headers = {"Authorization": f"Bearer {token}"}
+    rng = random.Random(1)
+    paths = [
+        lambda: (f"/books/{rng.randint(1, books)}", None),
+        lambda: (f"/books/pengarang {rng.randint(0, 99)}", None),
+        lambda: ("/users/user_data", headers),
+    ]
+    latencies = []
+    queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(paths[i % len(paths)])
+
+    async def worker(client):
+        while not queue.empty():
+            path, hdrs = queue.get_nowait()()
+            start = time.perf_counter()
+            response = await client.get(path, headers=hdrs)
+            latencies.append(time.perf_counter() - start)
+            response.raise_for_status()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "rps": total / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+    }
+
+
+def child(args):
+    workdir = tempfile.mkdtemp(prefix="bench_db_")
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+    os.environ["DB_INIT_SCHEMA"] = "true"
+    try:
+        from app.main import app
+
+        async def run():
+            # ASGITransport tidak menjalankan lifespan, jadi startup/shutdown dipanggil sendiri
+            async with app.router.lifespan_context(app):
+                token = seed(args.books)
+                return await drive(app, token, args.books, args.requests, args.concurrency)
+
+        print(json.dumps(asyncio.run(run())))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync vs async database stack load benchmark")
+    parser.add_argument("--books", type=int, default=10_000)
+    parser.add_argument("--requests", type=int, default=2_000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args)
+        return
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}, {args.books} books")
+    print(f"{'mode':<8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for mode in ("sync", "async"):
+        # Mode database dipilih saat import, jadi tiap mode jalan di proses sendiri
+        env = dict(os.environ, DATABASE_ASYNC="true" if mode == "async" else "false")
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.db_modes", "--child",
+             "--books", str(args.books), "--requests", str(args.requests),
+             "--concurrency", str(args.concurrency)],
+            env=env, check=True, capture_output=True, text=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{mode:<8}{result['rps']:>10.1f}{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+# Load test in-process untuk semua endpoint utama, lihat __main__.py
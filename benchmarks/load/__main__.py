@@ -0,0 +1,126 @@
+# Load test in-process: seed SQLite sementara lalu jalankan app.main.app lewat ASGI transport httpx
+# di beberapa level concurrency. Hasil ditulis sebagai JSON dan bisa dibandingkan dengan baseline.
+#
+#   python -m benchmarks.load --users 1000 --books 20000 --borrowed 5000 --concurrency 1,10,50
+#   python -m benchmarks.load --output baseline.json
+#   python -m benchmarks.load --baseline baseline.json --threshold 0.15
+#
+# Exit code 1 kalau ada route yang p95-nya naik melebihi threshold terhadap baseline.
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.load", description="In-process ASGI load test")
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--books", type=int, default=10_000)
+    parser.add_argument("--borrowed", type=int, default=5_000)
+    parser.add_argument("--concurrency", default="1,10,50", help="comma separated levels")
+    parser.add_argument("--requests", type=int, default=200, help="requests per route per level")
+    parser.add_argument("--warmup", type=int, default=5, help="unmeasured requests per route")
+    parser.add_argument("--routes", nargs="*", help="only run routes whose name contains one of these")
+    parser.add_argument("--async-db", action="store_true", help="run with DATABASE_ASYNC=true")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default="load_results.json")
+    parser.add_argument("--baseline", help="previous results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed relative p95 increase")
+    return parser.parse_args(argv)
+
+
+async def run(args, levels):
+    import httpx
+
+    from app.main import app
+    from benchmarks.load import scenarios
+    from benchmarks.load.runner import run_scenario
+    from benchmarks.load.seed import seed
+
+    rng = random.Random(args.seed)
+    selected = scenarios.select(args.routes)
+    results = {}
+
+    # ASGITransport tidak menjalankan lifespan, jadi startup/shutdown dipanggil sendiri
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app), \
+            httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        info = seed(args.users, args.books, args.borrowed, rng)
+        for scenario in selected:
+            total = max(int(args.requests * scenario.weight), 1)
+            if args.warmup:
+                await run_scenario(client, scenario, info, rng, scenarios.sequence,
+                                   min(args.warmup, total), 1)
+            for level in levels:
+                result = await run_scenario(client, scenario, info, rng, scenarios.sequence,
+                                            total, min(level, total))
+                results[f"{scenario.name} @c{level}"] = dict(result, route=scenario.name, concurrency=level)
+                print(f"{scenario.name:<32}{level:>5}{result['rps']:>10.1f}{result['p50_ms']:>9.2f}"
+                      f"{result['p95_ms']:>9.2f}{result['p99_ms']:>9.2f}{result['errors']:>7}", flush=True)
+    return results
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list:
+    regressions = []
+    print(f"\n{'route':<40}{'base p95':>10}{'now p95':>10}{'delta':>9}{'rps delta':>11}")
+    for key, now in current.items():
+        base = baseline.get(key)
+        if base is None or not base.get("p95_ms"):
+            continue
+        delta = now["p95_ms"] / base["p95_ms"] - 1
+        rps_delta = now["rps"] / base["rps"] - 1 if base.get("rps") else 0.0
+        flag = "  REGRESSION" if delta > threshold else ""
+        print(f"{key:<40}{base['p95_ms']:>10.2f}{now['p95_ms']:>10.2f}{delta:>+9.1%}{rps_delta:>+11.1%}{flag}")
+        if flag:
+            regressions.append(key)
+    return regressions
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    levels = [int(level) for level in args.concurrency.split(",") if level.strip()]
+
+    # Konfigurasi database dibaca saat import app, jadi env harus diset sebelum import
+    workdir = tempfile.mkdtemp(prefix="bench_load_")
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+    os.environ["DATABASE_ASYNC"] = "true" if args.async_db else "false"
+    os.environ["DB_INIT_SCHEMA"] = "true"
+    try:
+        print(f"{args.users} users, {args.books} books, {args.borrowed} borrowed, "
+              f"{args.requests} requests/route/level, db {'async' if args.async_db else 'sync'}")
+        print(f"{'route':<32}{'conc':>5}{'req/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>7}")
+        results = asyncio.run(run(args, levels))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "users": args.users, "books": args.books, "borrowed": args.borrowed,
+            "requests": args.requests, "concurrency": levels, "async_db": args.async_db,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nresults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(baseline, results, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} route(s) regressed more than {args.threshold:.0%} at p95")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
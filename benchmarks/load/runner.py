@@ -0,0 +1,51 @@
+import asyncio
+import math
+import time
+from collections import Counter
+
+
+def percentile(sorted_values, pct: float) -> float:
+    # Nearest-rank, cukup untuk ribuan sampel
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies, statuses: Counter, elapsed: float) -> dict:
+    latencies = sorted(latencies)
+    total = len(latencies)
+    ok = sum(count for status, count in statuses.items() if 200 <= status < 400)
+    return {
+        "requests": total,
+        "errors": total - ok,
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "rps": total / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": (latencies[-1] if latencies else 0.0) * 1000,
+    }
+
+
+# Jalankan `total` request dari satu skenario dengan `concurrency` worker
+async def run_scenario(client, scenario, info, rng, sequence, total: int, concurrency: int) -> dict:
+    latencies = []
+    statuses = Counter()
+    remaining = total
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            method, path, kwargs = scenario.build(rng, info, next(sequence))
+            start = time.perf_counter()
+            response = await client.request(method, path, **kwargs)
+            # Response streaming (export) baru selesai setelah body terbaca
+            await response.aread()
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status_code] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, statuses, time.perf_counter() - start)
@@ -0,0 +1,148 @@
+import itertools
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Callable
+
+from benchmarks.load.seed import PASSWORD, SeedInfo
+
+
+@dataclass
+class Scenario:
+    name: str
+    # (rng, seed info, urutan request) -> (method, path, kwargs httpx)
+    build: Callable
+    # Pengali jumlah request, untuk endpoint mahal seperti bcrypt
+    weight: float = 1.0
+
+
+def _auth(info: SeedInfo):
+    return {"Authorization": f"Bearer {info.admin_token}"}
+
+
+def _login(rng, info, n):
+    email = f"user{rng.randrange(info.users)}@example.com"
+    return "POST", "/auth/login", {"json": {"email": email, "password": PASSWORD}}
+
+
+def _register(rng, info, n):
+    return "POST", "/users/register", {"json": {
+        "name": "Bench", "username": f"bench{n}", "password": PASSWORD, "address": "-",
+        "phone": "-", "email": f"bench{n}-{rng.getrandbits(32)}@example.com"}}
+
+
+def _book_by_id(rng, info, n):
+    return "GET", f"/books/{rng.randint(1, info.books)}", {}
+
+
+def _books_by_ids(rng, info, n):
+    ids = ",".join(str(rng.randint(1, info.books)) for _ in range(50))
+    return "GET", "/books", {"params": {"ids": ids}}
+
+
+def _book_search(rng, info, n):
+    return "GET", f"/books/pengarang {rng.randrange(100)}", {"params": {"limit": 20}}
+
+
+def _book_search_fields(rng, info, n):
+    return "GET", f"/books/pengarang {rng.randrange(100)}", {"params": {"limit": 20, "fields": "name,stock"}}
+
+
+def _book_create(rng, info, n):
+    return "POST", "/books/buku/create", {"headers": _auth(info), "json": {
+        "name": f"Bench {n}", "author": "Bench", "isbn": f"bench-{n}-{rng.getrandbits(32)}",
+        "date": "2024-01-01", "stock": 5}}
+
+
+def _book_update(rng, info, n):
+    return "PUT", f"/books/{rng.randint(1, info.books)}/update", {
+        "headers": _auth(info), "json": {"stock": 1_000_000}}
+
+
+def _user_list(rng, info, n):
+    return "GET", "/users/user_data", {"headers": _auth(info), "params": {"limit": 20}}
+
+
+def _user_list_fields(rng, info, n):
+    return "GET", "/users/user_data", {"headers": _auth(info), "params": {"limit": 20, "fields": "name"}}
+
+
+def _user_by_id(rng, info, n):
+    return "GET", f"/users/{rng.randint(1, info.users)}", {"headers": _auth(info)}
+
+
+def _users_by_ids(rng, info, n):
+    ids = ",".join(str(rng.randint(1, info.users)) for _ in range(50))
+    return "GET", "/users", {"headers": _auth(info), "params": {"ids": ids}}
+
+
+def _user_update(rng, info, n):
+    return "PUT", f"/users/{rng.randint(2, max(info.users, 2))}/update", {
+        "headers": _auth(info), "json": {"address": f"Jl. Update {n}"}}
+
+
+def _borrowed_by_user(rng, info, n):
+    user_id = rng.choice(info.borrow_pairs)[0] if info.borrow_pairs else 1
+    return "GET", f"/borrowed/user/{user_id}", {"headers": _auth(info)}
+
+
+def _borrowed_by_book(rng, info, n):
+    book_id = rng.choice(info.borrow_pairs)[1] if info.borrow_pairs else 1
+    return "GET", f"/borrowed/book/{book_id}", {"headers": _auth(info)}
+
+
+def _borrow(rng, info, n):
+    today = date.today()
+    return "POST", "/borrowed/create", {"headers": _auth(info), "json": {
+        "user_id": rng.randint(1, info.users), "book_id": rng.randint(1, info.books),
+        "date_borrowed": today.isoformat(), "date_due": (today + timedelta(days=14)).isoformat()}}
+
+
+def _borrow_batch(rng, info, n):
+    today = date.today()
+    return "POST", "/borrowed/batch", {"headers": _auth(info), "json": {
+        "user_id": rng.randint(1, info.users), "book_ids": [rng.randint(1, info.books) for _ in range(10)],
+        "date_borrowed": today.isoformat(), "date_due": (today + timedelta(days=14)).isoformat()}}
+
+
+def _return(rng, info, n):
+    # Kalau stok peminjaman habis hasilnya 404 dan tercatat sebagai error
+    borrowed_id = info.open_borrowed.pop() if info.open_borrowed else 0
+    return "DELETE", f"/borrowed/{borrowed_id}/return", {"headers": _auth(info)}
+
+
+def _export_books(rng, info, n):
+    return "GET", "/export/books", {"headers": _auth(info), "params": {"format": "ndjson"}}
+
+
+# Logout dan delete tidak ikut: keduanya merusak token/data yang dipakai skenario lain
+SCENARIOS = [
+    Scenario("POST /auth/login", _login, weight=0.1),
+    Scenario("POST /users/register", _register, weight=0.1),
+    Scenario("GET /books/{id}", _book_by_id),
+    Scenario("GET /books?ids= (50)", _books_by_ids),
+    Scenario("GET /books/{keyword}", _book_search),
+    Scenario("GET /books/{keyword}?fields=name,stock", _book_search_fields),
+    Scenario("POST /books/buku/create", _book_create),
+    Scenario("PUT /books/{id}/update", _book_update),
+    Scenario("GET /users/user_data", _user_list),
+    Scenario("GET /users/user_data?fields=name", _user_list_fields),
+    Scenario("GET /users/{id}", _user_by_id),
+    Scenario("GET /users?ids= (50)", _users_by_ids),
+    Scenario("PUT /users/{id}/update", _user_update),
+    Scenario("GET /borrowed/user/{id}", _borrowed_by_user),
+    Scenario("GET /borrowed/book/{id}", _borrowed_by_book),
+    Scenario("POST /borrowed/create", _borrow),
+    Scenario("POST /borrowed/batch", _borrow_batch),
+    Scenario("DELETE /borrowed/{id}/return", _return),
+    Scenario("GET /export/books", _export_books, weight=0.05),
+]
+
+
+def select(patterns) -> list:
+    if not patterns:
+        return SCENARIOS
+    return [s for s in SCENARIOS if any(p.lower() in s.name.lower() for p in patterns)]
+
+
+# Nomor urut global supaya isbn/username unik di semua level concurrency
+sequence = itertools.count(1)
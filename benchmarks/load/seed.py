@@ -0,0 +1,60 @@
+import random
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+PASSWORD = "bench-password"
+
+
+@dataclass
+class SeedInfo:
+    users: int
+    books: int
+    borrowed: int
+    admin_token: str
+    admin_email: str
+    # id peminjaman yang masih bisa dikembalikan oleh skenario return
+    open_borrowed: list = field(default_factory=list)
+    # (user_id, book_id) yang punya peminjaman, supaya listing tidak berakhir 404
+    borrow_pairs: list = field(default_factory=list)
+
+
+# Isi database sementara; skema sudah dibuat oleh startup app (DB_INIT_SCHEMA=true)
+def seed(users: int, books: int, borrowed: int, rng: random.Random) -> SeedInfo:
+    from sqlalchemy import insert, select
+
+    from app import models
+    from app.auth.utils import create_access_token, hash_password
+    from app.database import SessionLocal
+
+    # bcrypt cukup sekali, semua user memakai password yang sama
+    hashed = hash_password(PASSWORD)
+    today = date.today()
+    db = SessionLocal()
+    try:
+        db.execute(insert(models.User), [
+            {"name": f"User {i}", "username": f"user{i}", "email": f"user{i}@example.com",
+             "password": hashed, "address": "Jl. Benchmark", "phone": "0812",
+             "role": models.RoleEnum.admin if i == 0 else models.RoleEnum.user}
+            for i in range(users)
+        ])
+        db.execute(insert(models.Book), [
+            {"name": f"Buku {i}", "author": f"Pengarang {i % 100}", "isbn": f"isbn-{i}",
+             "date": date(2020, 1, 1), "stock": 1_000_000}
+            for i in range(books)
+        ])
+        borrow_pairs = [(rng.randint(1, users), rng.randint(1, books)) for _ in range(borrowed)]
+        db.execute(insert(models.Borrowed), [
+            {"user_id": user_id, "book_id": book_id,
+             "date_borrowed": today, "date_due": today + timedelta(days=rng.randint(-10, 14))}
+            for user_id, book_id in borrow_pairs
+        ])
+        db.commit()
+        open_borrowed = list(db.scalars(select(models.Borrowed.id)))
+    finally:
+        db.close()
+
+    rng.shuffle(open_borrowed)
+    token = create_access_token(data={"sub": "user0@example.com", "role": "admin"})
+    return SeedInfo(users=users, books=books, borrowed=borrowed, admin_token=token,
+                    admin_email="user0@example.com", open_borrowed=open_borrowed,
+                    borrow_pairs=borrow_pairs)
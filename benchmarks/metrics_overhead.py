@@ -0,0 +1,73 @@
+# Overhead MetricsMiddleware per request: app ASGI kosong dengan dan tanpa middleware,
+# ditambah biaya render /metrics setelah semua route terisi.
+#
+#   python -m benchmarks.metrics_overhead --requests 200000 --routes 30
+import argparse
+import asyncio
+import time
+
+
+class _Route:
+    def __init__(self, path):
+        self.path = path
+
+
+def make_app(route):
+    async def app(scope, receive, send):
+        # Meniru router Starlette yang mengisi scope["route"] setelah match
+        scope["route"] = route
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+    return app
+
+
+async def drive(app, total: int):
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for i in range(total):
+        scope = {"type": "http", "method": "GET", "path": f"/books/{i}"}
+        await app(scope, receive, send)
+    return (time.perf_counter() - start) / total
+
+
+async def bench(total: int, route_count: int):
+    from app import metrics
+
+    routes = [_Route(f"/route{i}/{{item_id}}") for i in range(route_count)]
+    bare = make_app(routes[0])
+    wrapped = metrics.MetricsMiddleware(bare)
+
+    # Pemanasan sekaligus mengisi series untuk semua route
+    for route in routes:
+        await drive(metrics.MetricsMiddleware(make_app(route)), 100)
+
+    without = await drive(bare, total)
+    with_metrics = await drive(wrapped, total)
+    print(f"{total} requests through a no-op ASGI app")
+    print(f"{'without middleware':<22}{without * 1e6:>8.2f} us/request")
+    print(f"{'with middleware':<22}{with_metrics * 1e6:>8.2f} us/request")
+    print(f"{'overhead':<22}{(with_metrics - without) * 1e6:>8.2f} us/request")
+
+    rounds = 200
+    start = time.perf_counter()
+    for _ in range(rounds):
+        body = metrics.render()
+    elapsed = (time.perf_counter() - start) / rounds
+    print(f"render /metrics ({route_count} routes, {len(body) // 1024} KiB): {elapsed * 1000:.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MetricsMiddleware per-request overhead")
+    parser.add_argument("--requests", type=int, default=200_000)
+    parser.add_argument("--routes", type=int, default=30)
+    args = parser.parse_args()
+    asyncio.run(bench(args.requests, args.routes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# Laporan keterlambatan pada tabel borrowed besar, tanpa dan dengan index (date_due, user_id).
+#
+#   python -m benchmarks.overdue_report --borrowed 10000000 --overdue-pct 5
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+from datetime import date, timedelta
+
+AS_OF = date(2024, 6, 1)
+
+
+def seed(engine, users: int, books: int, borrowed: int, overdue_pct: float, chunk: int = 200_000):
+    rng = random.Random(1)
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        cursor.executemany("INSERT INTO users (name, username, email, password, address, phone, role, version) "
+                           "VALUES (?, ?, ?, 'x', '-', '-', 'user', 1)",
+                           [(f"User {i}", f"user{i}", f"user{i}@example.com") for i in range(users)])
+        cursor.executemany("INSERT INTO book (name, author, isbn, date, stock, version) "
+                           "VALUES (?, 'Pengarang', ?, '2020-01-01', 5, 1)",
+                           [(f"Buku {i}", f"isbn-{i}") for i in range(books)])
+        for start in range(0, borrowed, chunk):
+            rows = []
+            for _ in range(min(chunk, borrowed - start)):
+                if rng.random() * 100 < overdue_pct:
+                    due = AS_OF - timedelta(days=rng.randint(1, 120))
+                else:
+                    due = AS_OF + timedelta(days=rng.randint(0, 30))
+                rows.append((rng.randint(1, users), rng.randint(1, books),
+                             (due - timedelta(days=14)).isoformat(), due.isoformat()))
+            cursor.executemany("INSERT INTO borrowed (user_id, book_id, date_borrowed, date_due) "
+                               "VALUES (?, ?, ?, ?)", rows)
+        raw.commit()
+        cursor.execute("ANALYZE")
+    finally:
+        raw.close()
+
+
+def run_report(label: str):
+    from app import reports
+    from app.database import SessionLocal
+
+    start = time.perf_counter()
+    first = None
+    users = loans = 0
+    with SessionLocal() as db:
+        for group in reports.overdue_by_user(db, AS_OF):
+            if first is None:
+                first = time.perf_counter() - start
+            users += 1
+            loans += group["overdue"]
+    elapsed = time.perf_counter() - start
+    print(f"{label:<16}{elapsed:>9.2f} s{(first or 0) * 1000:>12.1f} ms{users:>10}{loans:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Overdue report with/without the due-date index")
+    parser.add_argument("--users", type=int, default=50_000)
+    parser.add_argument("--books", type=int, default=20_000)
+    parser.add_argument("--borrowed", type=int, default=1_000_000)
+    parser.add_argument("--overdue-pct", type=float, default=5.0)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_overdue_")
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+    try:
+        from sqlalchemy import text
+
+        from app import database, models
+        from app.migrate import init_schema
+
+        engine = database.get_engine()
+        init_schema(engine)
+        start = time.perf_counter()
+        seed(engine, args.users, args.books, args.borrowed, args.overdue_pct)
+        print(f"seeded {args.borrowed} borrowed rows in {time.perf_counter() - start:.1f} s, "
+              f"{args.overdue_pct}% overdue as of {AS_OF}")
+        print(f"{'index':<16}{'total':>11}{'first user':>15}{'users':>10}{'loans':>10}")
+
+        with engine.begin() as conn:
+            conn.execute(text("DROP INDEX ix_borrowed_date_due_user_id"))
+            conn.execute(text("ANALYZE"))
+        run_report("none")
+
+        # Jalur migrasi yang sama dengan database lama: index dibuat oleh add_missing_indexes
+        database.add_missing_indexes(engine, models.Borrowed.__table__)
+        with engine.begin() as conn:
+            conn.execute(text("ANALYZE"))
+        run_report("date_due,user_id")
+        engine.dispose()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# Microbenchmark serialisasi list endpoint: jalur response_model FastAPI vs typed_json.
+#
+#   python -m benchmarks.serialization --rows 100 --rounds 2000
+import argparse
+import asyncio
+import time
+from datetime import date, datetime, timedelta
+
+
+# (data, schema response_model, schema yang dipakai route untuk typed_json)
+def _rows(n):
+    from app import schemas
+
+    today = date.today()
+    books = [schemas.BookRecord(id=i, name=f"Buku {i}", author=f"Pengarang {i % 17}", isbn=f"978{i:010d}",
+                                date=today, stock=i % 9, version=1, updated_at=datetime(2024, 1, 1)) for i in range(1, n + 1)]
+    users = [{"id": i, "name": f"User {i}", "username": f"user{i}", "email": f"user{i}@example.com",
+              "address": "Jl. Contoh", "phone": "0812", "role": "user"} for i in range(1, n + 1)]
+    borrowed = [{"id": i, "user": f"User {i}", "book": f"Buku {i}", "date_borrowed": today,
+                 "date_due": today + timedelta(days=7)} for i in range(1, n + 1)]
+    return {"books": (books, schemas.BookResponse, schemas.BookResponse), "users": (users, schemas.UserResponse, schemas.UserRecord),
+            "borrowed": (borrowed, schemas.BorrowedResponse, schemas.BorrowedResponse)}
+
+
+def _bench(fn, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List endpoint serialization cost")
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_model_field
+
+    from app.responses import typed_json
+
+    loop = asyncio.new_event_loop()
+    print(f"{args.rows} rows per response, {args.rounds} rounds")
+    print(f"{'endpoint':<12}{'response_model':>18}{'typed_json':>14}")
+    for name, (data, schema, record) in _rows(args.rows).items():
+        field = create_model_field(name="Response", type_=list[schema], mode="serialization")
+
+        # Jalur default: validasi response_model -> jsonable_encoder -> json.dumps
+        def default_path():
+            content = loop.run_until_complete(
+                serialize_response(field=field, response_content=data, is_coroutine=True))
+            return JSONResponse(content).body
+
+        def fast_path():
+            return typed_json(list[record], data).body
+
+        assert len(default_path()) > 0 and len(fast_path()) > 0
+        slow = _bench(default_path, args.rounds)
+        fast = _bench(fast_path, args.rounds)
+        print(f"{name:<12}{slow:>15.1f} us{fast:>11.1f} us  ({slow / fast:.1f}x)")
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
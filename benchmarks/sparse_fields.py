@@ -0,0 +1,73 @@
+# ?fields= vs full row: query + hidrasi + serialisasi satu halaman list, tanpa cache.
+#
+#   python -m benchmarks.sparse_fields --rows 20000 --limit 100 --rounds 300
+import argparse
+import time
+from datetime import date
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app import crud, models, pagination, schemas
+from app.database import Base
+from app.responses import typed_json
+
+CASES = [
+    ("books full", "book", None),
+    ("books id,name", "book", "name"),
+    ("books id,name,stock", "book", "name,stock"),
+    ("users full", "user", None),
+    ("users id,name", "user", "name"),
+]
+
+
+def seed(session: Session, rows: int):
+    session.execute(insert(models.Book), [
+        {"name": f"Buku {i}", "author": f"Pengarang {i % 97}", "isbn": f"978{i:010d}",
+         "date": date(2020, 1, 1), "stock": i % 9} for i in range(rows)
+    ])
+    session.execute(insert(models.User), [
+        {"name": f"User {i}", "username": f"user{i}", "email": f"user{i}@example.com", "password": "x" * 60,
+         "address": "Jl. Contoh No. 1", "phone": "0812", "role": models.RoleEnum.user} for i in range(rows)
+    ])
+    session.commit()
+
+
+def page(session: Session, kind: str, fields, limit: int) -> bytes:
+    if kind == "book":
+        rows = crud.get_book(session, "buku", limit=limit, fields=fields)
+        schema = schemas.projection(schemas.BookResponse, fields) if fields else schemas.BookResponse
+    else:
+        rows = crud.get_users(session, limit=limit, fields=fields)
+        schema = schemas.projection(schemas.UserRecord, fields) if fields else schemas.UserRecord
+    return typed_json(list[schema], rows).body
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sparse fieldset cost per list page")
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=300)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        seed(session, args.rows)
+        print(f"{'case':<22}{'us/page':>10}{'bytes':>10}")
+        for label, kind, raw in CASES:
+            allowed = schemas.BOOK_FIELDS if kind == "book" else schemas.USER_FIELDS
+            fields = pagination.parse_fields(raw, allowed)
+            body = page(session, kind, fields, args.limit)
+            start = time.perf_counter()
+            for _ in range(args.rounds):
+                page(session, kind, fields, args.limit)
+                # Identity map dikosongkan supaya tiap ronde benar-benar menghidrasi entity baru
+                session.expunge_all()
+            elapsed = (time.perf_counter() - start) / args.rounds * 1e6
+            print(f"{label:<22}{elapsed:>10.0f}{len(body):>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# Beban campuran (pencarian + pinjam/kembali) pada profil SQLite legacy vs production (WAL).
+#
+#   python -m benchmarks.sqlite_profile --threads 16 --seconds 10
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date
+
+
+def seed(books: int):
+    from sqlalchemy import insert
+
+    from app import models
+    from app.database import Base, SessionLocal, engine
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        db.add(models.User(name="Bench", username="bench", email="bench@example.com", password="x",
+                           address="-", phone="-", role=models.RoleEnum.user))
+        db.execute(insert(models.Book), [
+            {"name": f"Buku {i}", "author": f"Pengarang {i % 100}", "isbn": f"isbn-{i}",
+             "date": date(2020, 1, 1), "stock": 1_000_000}
+            for i in range(books)
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+
+def child(args):
+    from sqlalchemy.exc import OperationalError
+
+    from app import crud, schemas, search
+    from app.database import SessionLocal, engine
+
+    seed(args.books)
+    search.init_book_search(engine)
+    counts = {"reads": 0, "writes": 0, "errors": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.seconds
+
+    def worker(seed_value):
+        rng = random.Random(seed_value)
+        local = {"reads": 0, "writes": 0, "errors": 0}
+        while time.perf_counter() < deadline:
+            db = SessionLocal()
+            try:
+                if rng.random() < args.write_ratio:
+                    book_id = rng.randint(1, args.books)
+                    created = crud.create_borrowed(db, schemas.BorrowedCreate(
+                        user_id=1, book_id=book_id, date_borrowed=date(2024, 1, 1), date_due=date(2024, 1, 15)
+                    ))
+                    crud.return_borrowed(db, created["id"])
+                    local["writes"] += 1
+                elif rng.random() < 0.5:
+                    crud.get_book(db, info=rng.randint(1, args.books))
+                    local["reads"] += 1
+                else:
+                    crud.get_book(db, info=f"pengarang {rng.randint(0, 99)}")
+                    local["reads"] += 1
+            except OperationalError:
+                db.rollback()
+                local["errors"] += 1
+            finally:
+                db.close()
+        with lock:
+            for key, value in local.items():
+                counts[key] += value
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    engine.dispose()
+    print(json.dumps({key: value / args.seconds for key, value in counts.items()}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite legacy vs production profile under mixed load")
+    parser.add_argument("--books", type=int, default=10_000)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args)
+        return
+
+    print(f"{args.threads} threads, {args.seconds:g}s, {args.write_ratio:.0%} borrow/return, {args.books} books")
+    print(f"{'profile':<12}{'reads/s':>10}{'writes/s':>10}{'errors/s':>10}")
+    for profile in ("legacy", "production"):
+        workdir = tempfile.mkdtemp(prefix="bench_sqlite_")
+        # Profil dibaca saat import app.database, jadi tiap profil jalan di proses sendiri
+        env = dict(os.environ, SQLITE_PROFILE=profile, DATABASE_URL=f"sqlite:///{workdir}/bench.db")
+        try:
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.sqlite_profile", "--child",
+                 "--books", str(args.books), "--threads", str(args.threads),
+                 "--seconds", str(args.seconds), "--write-ratio", str(args.write_ratio)],
+                env=env, check=True, capture_output=True, text=True
+            ).stdout
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{profile:<12}{result['reads']:>10.1f}{result['writes']:>10.1f}{result['errors']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
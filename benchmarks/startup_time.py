@@ -0,0 +1,74 @@
+# Waktu import app.main dan startup lifespan, dibandingkan dengan budget.
+# Tiap percobaan jalan di proses baru supaya cache import tidak ikut terukur.
+#
+#   python -m benchmarks.startup_time --runs 5 --import-budget-ms 1500 --startup-budget-ms 250
+#
+# Exit code 1 kalau median melewati budget atau import sudah menyentuh database.
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+_CHILD = r"""
+import asyncio, json, os, time
+start = time.perf_counter()
+import app.main
+imported = time.perf_counter() - start
+from app import database
+touched = database._engine is not None or os.path.exists(os.environ["BENCH_DB_FILE"] + "-wal")
+
+async def boot():
+    start = time.perf_counter()
+    async with app.main.app.router.lifespan_context(app.main.app):
+        return time.perf_counter() - start
+
+print(json.dumps({"import": imported, "startup": asyncio.run(boot()), "db_touched_on_import": touched}))
+"""
+
+
+def measure(env: dict) -> dict:
+    output = subprocess.run([sys.executable, "-c", _CHILD], env=env, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import and startup time budget")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--import-budget-ms", type=float, default=1500)
+    parser.add_argument("--startup-budget-ms", type=float, default=250)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_startup_")
+    db_file = f"{workdir}/bench.db"
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_file}", BENCH_DB_FILE=db_file, DB_INIT_SCHEMA="false")
+    try:
+        subprocess.run([sys.executable, "-m", "app.migrate"], env=env, check=True, capture_output=True)
+
+        failed = False
+        print(f"{'mode':<22}{'import ms':>12}{'startup ms':>12}")
+        for label, init_schema in (("worker (no DDL)", "false"), ("DB_INIT_SCHEMA=true", "true")):
+            runs = [measure(dict(env, DB_INIT_SCHEMA=init_schema)) for _ in range(args.runs)]
+            import_ms = statistics.median(r["import"] for r in runs) * 1000
+            startup_ms = statistics.median(r["startup"] for r in runs) * 1000
+            print(f"{label:<22}{import_ms:>12.1f}{startup_ms:>12.1f}")
+            if any(r["db_touched_on_import"] for r in runs):
+                print(f"  importing app.main touched the database ({label})")
+                failed = True
+            if init_schema == "false":
+                failed |= import_ms > args.import_budget_ms or startup_ms > args.startup_budget_ms
+
+        print(f"budget: import {args.import_budget_ms:.0f} ms, worker startup {args.startup_budget_ms:.0f} ms"
+              f" -> {'FAIL' if failed else 'ok'}")
+        if failed:
+            sys.exit(1)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
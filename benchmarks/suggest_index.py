@@ -0,0 +1,114 @@
+# Memori dan latensi prefix index autocomplete (/books/suggest) untuk N judul sintetis.
+#
+#   python -m benchmarks.suggest_index --books 100000 --queries 20000 --budget-ms 1
+#
+# Exit code 1 kalau p99 query melewati budget.
+import argparse
+import random
+import statistics
+import time
+import tracemalloc
+from datetime import date, datetime
+
+from sqlalchemy import create_engine, insert, update
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app import models
+from app.database import Base
+from app.suggest import PrefixIndex
+
+WORDS = ("python data learning deep systems design modern guide practical art history science "
+         "introduction advanced programming network security cloud machine theory complete "
+         "handbook world story night river garden city secret last first music café école").split()
+SURNAMES = "Smith Lutz Ramalho Zola Tanaka Nguyen Santoso Wijaya Müller García Rossi Kowalski".split()
+
+
+def seed(session: Session, count: int, rng: random.Random):
+    rows = [
+        {"name": " ".join(rng.choice(WORDS).title() for _ in range(rng.randint(2, 6))) + f" {i % 97}",
+         "author": f"{rng.choice(SURNAMES)} {rng.choice(WORDS).title()}",
+         "isbn": f"bench-{i}", "date": date(2000, 1, 1), "stock": 1, "updated_at": datetime(2020, 1, 1)}
+        for i in range(count)
+    ]
+    session.execute(insert(models.Book), rows)
+    session.commit()
+
+
+def percentile(samples: list, q: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prefix index memory and query latency")
+    parser.add_argument("--books", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=20_000)
+    parser.add_argument("--limit", type=int, default=8)
+    parser.add_argument("--budget-ms", type=float, default=1.0)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        seed(session, args.books, rng)
+
+        index = PrefixIndex()
+        start = time.perf_counter()
+        index.build(session)
+        build_s = time.perf_counter() - start
+
+        # Build kedua di bawah tracemalloc hanya untuk mengukur memori (tracemalloc memperlambat build)
+        traced = PrefixIndex()
+        tracemalloc.start()
+        traced.build(session)
+        memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del traced
+
+    prefixes = [rng.choice(WORDS + SURNAMES)[:rng.randint(1, 5)] for _ in range(args.queries)]
+    timings = []
+    for prefix in prefixes:
+        start = time.perf_counter()
+        index.suggest(prefix, args.limit)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    updates = []
+    for i in range(1000):
+        book_id = args.books + i + 1
+        start = time.perf_counter()
+        index.put(book_id, f"Fresh Title {i}", "New Author")
+        index.remove(book_id)
+        updates.append((time.perf_counter() - start) * 1000)
+
+    # Refresh tanpa perubahan (hanya query watermark + scan id), lalu setelah 1000 buku diubah
+    with Session(engine) as session:
+        start = time.perf_counter()
+        index.refresh(session)
+        refresh_idle = time.perf_counter() - start
+        session.execute(update(models.Book).where(models.Book.id <= 1000)
+                        .values(name=models.Book.name + " Revised", updated_at=datetime.now()))
+        session.commit()
+        start = time.perf_counter()
+        index.refresh(session)
+        refresh_changed = time.perf_counter() - start
+
+    print(f"books            {args.books}")
+    print(f"entries          {len(index)}")
+    print(f"build            {build_s:.2f} s")
+    print(f"memory           {memory / 2**20:.1f} MiB ({memory / 2**20 * 100_000 / args.books:.1f} MiB per 100k books)")
+    print(f"query p50        {statistics.median(timings):.3f} ms")
+    print(f"query p99        {percentile(timings, 0.99):.3f} ms")
+    print(f"put+remove p50   {statistics.median(updates):.3f} ms")
+    print(f"refresh idle     {refresh_idle * 1000:.0f} ms")
+    print(f"refresh 1k rows  {refresh_changed * 1000:.0f} ms")
+
+    p99 = percentile(timings, 0.99)
+    if p99 > args.budget_ms:
+        print(f"p99 {p99:.3f} ms exceeds budget {args.budget_ms} ms")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()